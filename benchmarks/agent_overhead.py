@@ -0,0 +1,245 @@
+"""Offline benchmarks of deepagents' own per-step overhead.
+
+Usage:
+    python benchmarks/agent_overhead.py [--files 200] [--file-size 4000]
+        [--steps 20] [--subagents 8] [--repeat 200] [--json]
+
+Every model response comes from `ScriptedChatModel`, so nothing here touches
+the network and the numbers only reflect framework work: the file tools,
+`file_reducer`, agent steps, `task` fan-out, the interrupt hook and
+checkpointing. Compare runs before and after a change with the same
+parameters to catch regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+from typing import Any, Callable
+
+# The scripted chat model is shared with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+warnings.filterwarnings("ignore")
+
+from fake_model import ScriptedChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.prebuilt.interrupt import HumanInterruptConfig  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+from deepagents import create_deep_agent  # noqa: E402
+from deepagents.interrupt import create_interrupt_hook  # noqa: E402
+from deepagents.state import file_reducer  # noqa: E402
+from deepagents.tools import (  # noqa: E402
+    edit_file,
+    glob,
+    grep,
+    ls,
+    read_file,
+    write_file,
+)
+
+APPROVE_ONLY = HumanInterruptConfig(
+    allow_accept=True, allow_edit=False, allow_ignore=False, allow_respond=False
+)
+
+
+def make_files(count: int, size: int) -> dict[str, str]:
+    """`count` files of about `size` characters each, in 80-character lines."""
+    files = {}
+    for i in range(count):
+        line = f"file {i} line of text for benchmarking, padded out to eighty chars".ljust(79)
+        body = "\n".join(line for _ in range(max(size // 80, 1)))
+        files[f"src/pkg{i % 10}/module_{i}.py"] = body + f"\nUNIQUE_MARKER_{i}\n"
+    return files
+
+
+def per_call(fn: Callable[[], Any], repeat: int) -> float:
+    """Median seconds per call of `fn`, over `repeat` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_tool(tool, args: dict[str, Any], state: dict[str, Any]) -> Any:
+    return tool.invoke(
+        {"type": "tool_call", "name": tool.name, "id": "bench", "args": {**args, "state": state}}
+    )
+
+
+def bench_tools(files: dict[str, str], repeat: int) -> dict[str, float]:
+    state = {"messages": [], "files": file_reducer({}, files)}
+    some_path = next(iter(files))
+    results = {
+        "ls": per_call(lambda: run_tool(ls, {}, state), repeat),
+        "ls (prefix)": per_call(lambda: run_tool(ls, {"path_prefix": "src/pkg3/"}, state), repeat),
+        "read_file (100 lines)": per_call(
+            lambda: run_tool(read_file, {"file_path": some_path, "offset": 10, "limit": 100}, state),
+            repeat,
+        ),
+        "write_file": per_call(
+            lambda: run_tool(write_file, {"file_path": "new.txt", "content": "x" * 1000}, state),
+            repeat,
+        ),
+        "edit_file": per_call(
+            lambda: run_tool(
+                edit_file,
+                {"file_path": some_path, "old_string": "UNIQUE_MARKER_0", "new_string": "UNIQUE_MARKER_0"},
+                state,
+            ),
+            repeat,
+        ),
+        "grep (literal)": per_call(lambda: run_tool(grep, {"pattern": "UNIQUE_MARKER_7\\b"}, state), repeat),
+        "glob": per_call(lambda: run_tool(glob, {"pattern": "src/pkg1/*.py"}, state), repeat),
+    }
+    return {f"tool {name}": seconds for name, seconds in results.items()}
+
+
+def bench_reducer(files: dict[str, str], repeat: int) -> dict[str, float]:
+    current = file_reducer({}, files)
+    paths = list(files)
+    counter = iter(range(10**9))
+
+    def apply_one():
+        nonlocal current
+        path = paths[next(counter) % len(paths)]
+        current = file_reducer(current, {path: files[path] + "!"})
+
+    return {
+        "file_reducer (load all files)": per_call(lambda: file_reducer({}, files), max(repeat // 10, 1)),
+        "file_reducer (1-file delta)": per_call(apply_one, repeat),
+    }
+
+
+def agent_run(files: dict[str, str], steps: int, checkpointer=None) -> tuple[float, Any]:
+    """Run `steps` alternating write/read steps; return (seconds, final state)."""
+    script = []
+    for i in range(steps):
+        if i % 2 == 0:
+            script.append([("write_file", {"file_path": f"out/{i}.md", "content": f"step {i}\n" * 50})])
+        else:
+            script.append([("read_file", {"file_path": f"out/{i - 1}.md", "limit": 20})])
+    script.append("done")
+    agent = create_deep_agent(
+        [], "Benchmark agent.", model=ScriptedChatModel(script=script), checkpointer=checkpointer
+    )
+    config = {"configurable": {"thread_id": "bench"}, "recursion_limit": 4 * steps + 10}
+    start = time.perf_counter()
+    result = asyncio.run(agent.ainvoke({"messages": [{"role": "user", "content": "go"}], "files": files}, config))
+    return time.perf_counter() - start, result
+
+
+def bench_agent_steps(files: dict[str, str], steps: int) -> dict[str, float]:
+    plain, _ = agent_run(files, steps)
+    saver = InMemorySaver()
+    checkpointed, _ = agent_run(files, steps, checkpointer=saver)
+    checkpoint = saver.get_tuple({"configurable": {"thread_id": "bench"}}).checkpoint
+    _, latest = saver.serde.dumps_typed(checkpoint)
+    # Channel values are stored once per new version, checkpoints once per step
+    stored = sum(len(data) for _, data in saver.blobs.values())
+    stored += sum(
+        len(saved[0][1]) + len(saved[1][1])
+        for namespaces in saver.storage.values()
+        for checkpoints in namespaces.values()
+        for saved in checkpoints.values()
+    )
+    return {
+        "agent step (no checkpointer)": plain / (steps + 1),
+        "agent step (InMemorySaver)": checkpointed / (steps + 1),
+        "checkpoint overhead per step": (checkpointed - plain) / (steps + 1),
+        "checkpoint size, latest (bytes)": len(latest),
+        "checkpoint blobs, whole thread (bytes)": stored,
+    }
+
+
+def bench_fanout(subagents: int) -> dict[str, float]:
+    sub_model = ScriptedChatModel(
+        script=[[("write_file", {"file_path": "notes.md", "content": "notes\n" * 20})], "sub done"]
+    )
+    calls = [("task", {"description": f"job {i}", "subagent_type": "worker"}) for i in range(subagents)]
+    agent = create_deep_agent(
+        [],
+        "Benchmark agent.",
+        model=ScriptedChatModel(script=[calls, "done"]),
+        subagents=[{"name": "worker", "description": "Does a job.", "prompt": "Do the job.", "model": sub_model}],
+    )
+    start = time.perf_counter()
+    asyncio.run(agent.ainvoke({"messages": [{"role": "user", "content": "go"}]}))
+    elapsed = time.perf_counter() - start
+    return {
+        f"task fan-out ({subagents} subagents)": elapsed,
+        "task fan-out per subagent": elapsed / max(subagents, 1),
+    }
+
+
+def bench_interrupt(repeat: int) -> dict[str, float]:
+    hook = create_interrupt_hook({"write_file": APPROVE_ONLY})
+    message = AIMessage(
+        "", tool_calls=[{"name": "read_file", "args": {"file_path": "a"}, "id": f"c{i}"} for i in range(5)]
+    )
+    state = {"messages": [message]}
+
+    agent = create_deep_agent(
+        [],
+        "Benchmark agent.",
+        model=ScriptedChatModel(script=[[("write_file", {"file_path": "a", "content": "a"})], "done"]),
+        interrupt_config={"write_file": APPROVE_ONLY},
+        checkpointer=InMemorySaver(),
+    )
+    counter = iter(range(10**9))
+
+    def round_trip():
+        config = {"configurable": {"thread_id": f"t{next(counter)}"}}
+        agent.invoke({"messages": [{"role": "user", "content": "go"}]}, config)
+        agent.invoke(Command(resume=[{"type": "accept", "args": None}]), config)
+
+    return {
+        "interrupt hook (no matching calls)": per_call(lambda: hook(state), repeat),
+        "interrupt + resume round trip": per_call(round_trip, max(repeat // 20, 3)),
+    }
+
+
+def format_value(name: str, value: float) -> str:
+    if "bytes" in name:
+        return f"{value:>12,.0f}"
+    if value >= 0.1:
+        return f"{value:>10.3f} s"
+    return f"{value * 1e6:>10.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="files in state")
+    parser.add_argument("--file-size", type=int, default=4000, help="characters per file")
+    parser.add_argument("--steps", type=int, default=20, help="agent steps per run")
+    parser.add_argument("--subagents", type=int, default=8, help="parallel task calls")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per micro-benchmark")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    files = make_files(args.files, args.file_size)
+    results: dict[str, float] = {}
+    results.update(bench_tools(files, args.repeat))
+    results.update(bench_reducer(files, args.repeat))
+    results.update(bench_agent_steps(files, args.steps))
+    results.update(bench_fanout(args.subagents))
+    results.update(bench_interrupt(args.repeat))
+
+    if args.json:
+        print(json.dumps({"params": vars(args), "results": results}, indent=2))
+        return
+    print(f"files={args.files} file_size={args.file_size} steps={args.steps} subagents={args.subagents}")
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f"  {name:<{width}}  {format_value(name, value)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure how long `import deepagents` takes in a fresh interpreter.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--top 15]
+
+Each run starts a new Python process, so nothing is cached in `sys.modules`.
+Reports the min and median wall time of the import, which heavy optional
+modules it loaded, and the slowest imports according to `-X importtime`.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that should only be imported when a model actually needs them
+PROVIDER_MODULES = [
+    "langchain_anthropic",
+    "anthropic",
+    "langchain",
+    "langchain.chat_models",
+    "langchain_openai",
+    "openai",
+]
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import deepagents
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (PROVIDER_MODULES,)
+
+
+def measure_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", MEASURE],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> list[tuple[int, str]]:
+    """Return (cumulative microseconds, module) for the slowest imports."""
+    stderr = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import deepagents"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    times = [r["seconds"] for r in results]
+    print(f"import deepagents: min {min(times) * 1000:.0f} ms, "
+          f"median {statistics.median(times) * 1000:.0f} ms over {args.runs} runs")
+    print(f"provider modules loaded: {results[0]['loaded'] or 'none'}")
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for cumulative, name in slowest_imports(args.top):
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
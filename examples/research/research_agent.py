@@ -10,7 +10,7 @@ from langchain.chat_models import init_chat_model
 from langchain_openai import AzureChatOpenAI
 import httpx
 
-from deepagents import create_deep_agent, SubAgent
+from deepagents import create_deep_agent, SubAgent, Instrumentation, MetricsAggregator
 
 # Disable SSL verification for corporate proxy environments
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -236,6 +236,9 @@ For example, if the current time is January 29, 2025 at 2:30:52 PM, use:
 Generate the timestamp at the beginning of your task and use it consistently for both files.
 """
 
+# Records the duration and tokens of every model call, tool call and subagent
+metrics = MetricsAggregator()
+
 # Create the agent using Azure OpenAI model
 # Main agent has internet_search available for subagents but should delegate research
 agent = create_deep_agent(
@@ -243,6 +246,7 @@ agent = create_deep_agent(
     research_instructions,
     model=azure_model,
     subagents=[critique_sub_agent, research_sub_agent],
+    instrumentation=Instrumentation(metrics),
 ).with_config({"recursion_limit": 1000})
 
 # Test the agent setup
@@ -376,93 +380,29 @@ async def main():
                         f.write(final_content)
                     print(f"✅ Created {report_file}")
 
-        # Analyze tool calls and subagent usage
-        print("\n" + "="*50)
-        print("DETAILED EXECUTION ANALYSIS")
-        print("="*50)
-
-        tool_calls_count = {}
-        subagent_calls = []
-        errors = []
-
-        if result and "messages" in result:
-            for i, msg in enumerate(result["messages"]):
-                print(f"\n--- Message {i+1}: {type(msg).__name__} ---")
-
-                if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                    for tool_call in msg.tool_calls:
-                        tool_name = tool_call.get('name', 'unknown')
-                        tool_args = tool_call.get('args', {})
-
-                        # Count tool calls
-                        tool_calls_count[tool_name] = tool_calls_count.get(tool_name, 0) + 1
-
-                        print(f"  🔧 TOOL CALL: {tool_name}")
-                        print(f"     Args: {tool_args}")
-
-                        # Track subagent calls
-                        if tool_name == 'task':
-                            subagent_type = tool_args.get('subagent_type', 'unknown')
-                            description = tool_args.get('description', '')[:100] + '...'
-                            subagent_calls.append({
-                                'type': subagent_type,
-                                'description': description
-                            })
-                            print(f"     🤖 SUBAGENT: {subagent_type}")
-                            print(f"     📝 Task: {description}")
-
-                elif hasattr(msg, 'name') and hasattr(msg, 'content'):
-                    # Tool response message
-                    tool_name = msg.name
-                    content = msg.content
-
-                    print(f"  📤 TOOL RESPONSE: {tool_name}")
-
-                    if 'Error:' in content:
-                        errors.append({
-                            'tool': tool_name,
-                            'error': content[:200] + '...' if len(content) > 200 else content
-                        })
-                        print(f"     ❌ ERROR: {content[:100]}...")
-                    else:
-                        print(f"     ✅ SUCCESS: {len(content)} characters")
-                        if tool_name == 'internet_search':
-                            # Parse search results
-                            try:
-                                import json
-                                search_data = json.loads(content)
-                                if 'results' in search_data:
-                                    print(f"     🔍 Found {len(search_data['results'])} search results")
-                            except:
-                                pass
-
-                elif hasattr(msg, 'content') and msg.content:
-                    # Regular AI message
-                    content_preview = msg.content[:150] + '...' if len(msg.content) > 150 else msg.content
-                    print(f"  💬 AI RESPONSE: {content_preview}")
-
-        # Summary
+        # Where the time and tokens went, as recorded by the instrumentation
         print("\n" + "="*50)
         print("EXECUTION SUMMARY")
         print("="*50)
 
+        summary = metrics.summary()
         print(f"📊 Tool Calls Summary:")
-        for tool, count in tool_calls_count.items():
-            print(f"   {tool}: {count} calls")
-
-        if subagent_calls:
-            print(f"\n🤖 Subagent Calls: {len(subagent_calls)}")
-            for i, call in enumerate(subagent_calls, 1):
-                print(f"   {i}. {call['type']}: {call['description']}")
-        else:
-            print(f"\n🤖 Subagent Calls: 0 (agent used direct tools)")
-
-        if errors:
-            print(f"\n❌ Errors Encountered: {len(errors)}")
-            for i, error in enumerate(errors, 1):
-                print(f"   {i}. {error['tool']}: {error['error']}")
-        else:
-            print(f"\n✅ No errors encountered")
+        for tool_name, stats in summary.get("tool", {}).items():
+            print(f"   {tool_name}: {stats['count']} calls, {stats['errors']} errors, "
+                  f"{stats['duration']['total']:.1f}s total")
+
+        print(f"\n🤖 Subagent Calls:")
+        for subagent_type, stats in summary.get("subagent", {}).items():
+            print(f"   {subagent_type}: {stats['count']} calls, {stats['duration']['avg']:.1f}s avg, "
+                  f"{stats.get('queue_wait', {}).get('total', 0.0):.1f}s queued")
+
+        print(f"\n🧮 Model Usage by Agent:")
+        for agent_name, kinds in metrics.by_agent().items():
+            model_stats = kinds.get("model")
+            if model_stats:
+                print(f"   {agent_name}: {model_stats['count']} calls, "
+                      f"{model_stats['input_tokens']} input / {model_stats['output_tokens']} output tokens, "
+                      f"{model_stats['duration']['total']:.1f}s")
 
     except Exception as e:
         print(f"\n❌ ERROR during execution: {e}")
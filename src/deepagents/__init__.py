@@ -1,5 +1,37 @@
 from deepagents.graph import create_deep_agent
+from deepagents.factory import DeepAgentFactory
+from deepagents.batch import BatchResult, arun_batch, run_batch
 from deepagents.interrupt import ToolInterruptConfig
+from deepagents.compaction import CompactionConfig, create_compaction_hook
 from deepagents.state import DeepAgentState
 from deepagents.sub_agent import SubAgent
 from deepagents.model import get_default_model
+from deepagents.caching import PromptCacheUsage
+from deepagents.scheduler import TaskScheduler
+from deepagents.registry import ModelRegistry, default_model_registry
+from deepagents.routing import ModelRouter
+from deepagents.tool_execution import IsolatedToolNode, read_only, writes_files
+from deepagents.instrumentation import (
+    Instrumentation,
+    MetricsAggregator,
+    OpenTelemetryExporter,
+    Span,
+)
+from deepagents.result_cache import (
+    ResultCache,
+    InMemoryResultCache,
+    SQLiteResultCache,
+)
+from deepagents.blobs import (
+    BlobStore,
+    InMemoryBlobStore,
+    LocalDirectoryBlobStore,
+    SQLiteBlobStore,
+)
+from deepagents.backends import (
+    FileBackend,
+    StateBackend,
+    LocalDirectoryBackend,
+    SQLiteBackend,
+    InvalidPathError,
+)
@@ -0,0 +1,589 @@
+"""Storage backends for the built-in file tools.
+
+The `ls`, `read_file`, `write_file` and `edit_file` tools do not touch
+`state["files"]` directly; they go through a `FileBackend`. The default
+`StateBackend` keeps files in graph state (optionally as `BlobStore`
+references). `LocalDirectoryBackend` and `SQLiteBackend` keep them outside of
+graph state and process memory, namespaced per thread.
+"""
+
+import contextlib
+import errno
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from langchain_core.runnables import RunnableConfig
+
+from deepagents.blobs import BlobStore, is_blob_ref
+from deepagents.files import FileContent, FileMap, content_digest, file_size
+from deepagents.search import SearchIndex
+
+# UTF-8 encodings of the line boundaries `str.splitlines` uses
+_LINE_BREAK_BYTES = re.compile(rb"\r\n|[\n\r\v\f\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+_NON_SPACE_BYTES = re.compile(rb"\S")
+
+
+# Thread ids used as directory names as they are; anything else is hashed
+_SAFE_NAMESPACE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]{0,127}")
+# Temporary files `LocalDirectoryBackend.write` renames into place
+_PARTIAL_FILE = re.compile(r"\..*\.deepagents-\d+-\d+\.partial")
+# Errors that mean there is no file at a path
+_NOT_A_FILE = (FileNotFoundError, IsADirectoryError, NotADirectoryError)
+
+
+class InvalidPathError(ValueError):
+    """A file path that a backend can't store, e.g. one outside its directory.
+
+    The file tools return it to the model as an error message.
+    """
+
+
+def _thread_namespace(config: Optional[RunnableConfig]) -> str:
+    configurable = (config or {}).get("configurable") or {}
+    return str(configurable.get("thread_id", ""))
+
+
+def _versions_digest(versions: dict[str, Any], namespace: str = "") -> str:
+    digest = hashlib.sha256(namespace.encode("utf-8", "surrogatepass") + b"\0")
+    for path in sorted(versions):
+        version = versions[path]
+        version = version if isinstance(version, str) else repr(version)
+        for part in (path, version):
+            encoded = part.encode("utf-8", "surrogatepass")
+            digest.update(b"%d:" % len(encoded) + encoded)
+    return digest.hexdigest()
+
+
+class FileBackend:
+    """Base class for file storage used by the built-in file tools.
+
+    `write` returns the delta to merge into `state["files"]` (empty when the
+    backend keeps files outside of graph state). Subclasses must call
+    `super().__init__()`.
+    """
+
+    # What the sizes from `iter_files` count, as `ls` labels them
+    size_unit = "chars"
+
+    def __init__(self, max_search_indexes: int = 32):
+        # One search index per namespace (thread), least recently used evicted.
+        # Views of a namespace (a parent agent and its subagents) share it.
+        self._search_indexes: OrderedDict[str, SearchIndex] = OrderedDict()
+        self._max_search_indexes = max_search_indexes
+        self._search_lock = threading.Lock()
+
+    def ls(self, state: dict[str, Any], config: RunnableConfig) -> list[str]:
+        raise NotImplementedError
+
+    def read(
+        self, file_path: str, state: dict[str, Any], config: RunnableConfig
+    ) -> Optional[FileContent]:
+        """Return the full contents of a file, or None if it does not exist."""
+        raise NotImplementedError
+
+    def open(self, file_path: str, state: dict[str, Any], config: RunnableConfig):
+        """Return a view for paged reads, or None if the file does not exist.
+
+        The view supports `len`, `isspace()`, `line_count` and `read_lines()`,
+        like `FileContent`. Defaults to `read`.
+        """
+        return self.read(file_path, state, config)
+
+    def write(
+        self,
+        file_path: str,
+        content: FileContent,
+        state: dict[str, Any],
+        config: RunnableConfig,
+    ) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def write_files(
+        self, contents: dict[str, FileContent], state: dict[str, Any], config: RunnableConfig
+    ) -> dict[str, Any]:
+        """Write several files, returning one delta for all of them.
+
+        Defaults to one `write` per file. Backends that keep files outside of
+        the state override it so that a failure leaves every file unchanged.
+        """
+        delta = {}
+        for file_path, content in contents.items():
+            delta.update(self.write(file_path, content, state, config))
+        return delta
+
+    def iter_files(
+        self,
+        state: dict[str, Any],
+        config: RunnableConfig,
+        prefix: str = "",
+        start: str = "",
+    ) -> Iterator[tuple[str, int]]:
+        """Yield `(path, size)` for paths starting with `prefix` and `>= start`, sorted.
+
+        Sizes are in `size_unit`. The default sorts the output of `ls`; backends with an ordered path
+        index override this so a page of results costs O(page).
+        """
+        sizes = {}
+        for file_path in sorted(self.ls(state, config)):
+            if file_path.startswith(prefix) and file_path >= start:
+                if file_path not in sizes:
+                    content = self.read(file_path, state, config)
+                    sizes[file_path] = len(content) if content is not None else 0
+                yield file_path, sizes[file_path]
+
+    def file_versions(self, state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+        """Return a token per path that changes whenever that file changes."""
+        raise NotImplementedError
+
+    def files_digest(self, state: dict[str, Any], config: RunnableConfig) -> str:
+        """Return a hash that changes whenever any file in this namespace changes.
+
+        Version tokens are only comparable within a namespace, so the namespace
+        is part of the hash.
+        """
+        return _versions_digest(self.file_versions(state, config), _thread_namespace(config))
+
+    def search(self, literals: list[str], state: dict[str, Any], config: RunnableConfig) -> list[str]:
+        """Return the sorted paths of files that may contain all of `literals`.
+
+        Uses this namespace's trigram index, indexing only file versions it
+        has not seen before.
+        """
+        namespace = _thread_namespace(config)
+        with self._search_lock:
+            index = self._search_indexes.get(namespace)
+            if index is None:
+                index = self._search_indexes[namespace] = SearchIndex()
+            self._search_indexes.move_to_end(namespace)
+            while len(self._search_indexes) > self._max_search_indexes:
+                self._search_indexes.popitem(last=False)
+        return index.search(
+            self.file_versions(state, config),
+            lambda file_path: self.read(file_path, state, config),
+            literals,
+        )
+
+
+def _state_version(value: Any) -> str:
+    if is_blob_ref(value):
+        return value["blob"]
+    if isinstance(value, FileContent):
+        return value.digest
+    return content_digest(value)
+
+
+class StateBackend(FileBackend):
+    """Keeps files in `state["files"]`. This is the default backend.
+
+    If a `blob_store` is given, written files are stored in it and the state
+    only keeps a `BlobRef` per path; bodies are loaded when a tool reads them.
+    """
+
+    def __init__(self, blob_store: Optional[BlobStore] = None):
+        super().__init__()
+        self.blob_store = blob_store
+
+    def ls(self, state, config):
+        return list(state.get("files", {}).keys())
+
+    def read(self, file_path, state, config):
+        files = state.get("files", {})
+        if file_path not in files:
+            return None
+        content = files[file_path]
+        if is_blob_ref(content):
+            if self.blob_store is None:
+                raise ValueError(
+                    f"File '{file_path}' is kept in a blob store; read it with the agent's "
+                    "file backend (StateBackend(blob_store))"
+                )
+            return self.blob_store.get(content)
+        if not isinstance(content, FileContent):
+            content = FileContent(content)
+        return content
+
+    def write(self, file_path, content, state, config):
+        if self.blob_store is not None:
+            return {file_path: self.blob_store.put(content)}
+        return {file_path: content}
+
+    def iter_files(self, state, config, prefix="", start=""):
+        files = state.get("files", {})
+        # FileMap keeps its sorted paths up to date; anything else is sorted once here
+        paths = files.sorted_paths() if isinstance(files, FileMap) else sorted(files)
+        i = bisect_left(paths, max(prefix, start))
+        while i < len(paths) and paths[i].startswith(prefix):
+            file_path = paths[i]
+            yield file_path, file_size(files[file_path])
+            i += 1
+
+    def file_versions(self, state, config):
+        # The digest of the contents (computed once per FileContent), so
+        # versions don't hold on to the contents
+        return {path: _state_version(value) for path, value in state.get("files", {}).items()}
+
+    def files_digest(self, state, config):
+        # Versions are content digests, so equal digests mean equal files in
+        # any thread
+        return _versions_digest(self.file_versions(state, config))
+
+
+class MappedFile:
+    """A read-only, memory-mapped view of a UTF-8 file on disk.
+
+    The line index holds byte offsets, so only the requested lines are decoded
+    and the rest of the file stays in the OS page cache rather than in process
+    memory.
+    """
+
+    def __init__(self, path: Path, index: tuple[list[int], list[int]], size: int):
+        self.path = path
+        self._starts, self._ends = index
+        self._size = size
+
+    @classmethod
+    def build_index(cls, mm) -> tuple[list[int], list[int]]:
+        starts, ends = [], []
+        pos = 0
+        for match in _LINE_BREAK_BYTES.finditer(mm):
+            starts.append(pos)
+            ends.append(match.start())
+            pos = match.end()
+        if pos < len(mm):
+            starts.append(pos)
+            ends.append(len(mm))
+        return starts, ends
+
+    def __len__(self) -> int:
+        return self._size
+
+    def isspace(self) -> bool:
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _NON_SPACE_BYTES.search(mm) is None
+
+    @property
+    def line_count(self) -> int:
+        return len(self._starts)
+
+    def read_lines(
+        self, offset: int, limit: int, max_length: Optional[int] = None
+    ) -> list[str]:
+        lines = []
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in zip(
+                self._starts[offset : offset + limit], self._ends[offset : offset + limit]
+            ):
+                if max_length is not None:
+                    # A character is at most 4 bytes in UTF-8
+                    end = min(end, start + 4 * max_length)
+                line = mm[start:end].decode("utf-8", errors="replace")
+                if max_length is not None:
+                    line = line[:max_length]
+                lines.append(line)
+        return lines
+
+
+class LocalDirectoryBackend(FileBackend):
+    """Keeps files as real files under `root`, one subdirectory per thread.
+
+    Paged reads go through `mmap` with a cached line index, so large files are
+    never fully loaded into memory by `read_file`.
+    """
+
+    # Sizes come from `stat`; counting characters would mean reading every file
+    size_unit = "bytes"
+
+    def __init__(
+        self,
+        root: Union[str, os.PathLike],
+        per_thread: bool = True,
+        index_cache_size: int = 256,
+    ):
+        super().__init__()
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.per_thread = per_thread
+        self._index_cache: OrderedDict[tuple, tuple[list[int], list[int]]] = OrderedDict()
+        self._index_cache_size = index_cache_size
+        self._lock = threading.Lock()
+
+    def _directory(self, config) -> Path:
+        if not self.per_thread:
+            return self.root
+        namespace = _thread_namespace(config) or "default"
+        if not _SAFE_NAMESPACE.fullmatch(namespace):
+            # Could contain separators or "..": use a name that can't, and
+            # that no safe thread id can take ("@" is not allowed in those)
+            namespace = "@" + hashlib.sha256(namespace.encode("utf-8", "surrogatepass")).hexdigest()
+        return self.root / namespace
+
+    def _resolve(self, file_path: str, config) -> Path:
+        directory = self._directory(config)
+        path = (directory / file_path.lstrip("/")).resolve()
+        if directory not in path.parents:
+            raise InvalidPathError(f"Path '{file_path}' is outside of the backend directory")
+        return path
+
+    def _walk(self, config):
+        directory = self._directory(config)
+        if not directory.exists():
+            return
+        for path in directory.rglob("*"):
+            if path.is_file() and not _PARTIAL_FILE.fullmatch(path.name):
+                yield str(path.relative_to(directory)), path
+
+    def ls(self, state, config):
+        return sorted(file_path for file_path, _ in self._walk(config))
+
+    def iter_files(self, state, config, prefix="", start=""):
+        # Walks directories in sorted order and only enters those that can
+        # hold paths from `start` on under `prefix`, so a page costs the
+        # entries listed plus the directories on the way to them rather than
+        # a walk of the whole tree
+        directory = self._directory(config)
+        yield from self._iter_sorted(directory, "", prefix, max(prefix, start))
+
+    def _iter_sorted(self, directory, base: str, prefix: str, start: str):
+        try:
+            entries = list(os.scandir(directory))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        keyed = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Everything in a directory sorts as "<name>/..." among its
+                # siblings' paths
+                keyed.append((base + entry.name + "/", entry))
+            elif entry.is_file() and not _PARTIAL_FILE.fullmatch(entry.name):
+                keyed.append((base + entry.name, entry))
+        keyed.sort(key=lambda item: item[0])
+        for key, entry in keyed:
+            if key.endswith("/"):
+                if key < start and not start.startswith(key):
+                    continue
+                if not (key.startswith(prefix) or prefix.startswith(key)):
+                    if key > prefix:
+                        return
+                    continue
+                yield from self._iter_sorted(entry.path, key, prefix, start)
+            else:
+                if key < start:
+                    continue
+                if not key.startswith(prefix):
+                    if key > prefix:
+                        return
+                    continue
+                try:
+                    yield key, entry.stat().st_size
+                except FileNotFoundError:
+                    continue
+
+    def file_versions(self, state, config):
+        versions = {}
+        for file_path, path in self._walk(config):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            versions[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return versions
+
+    def read(self, file_path, state, config):
+        path = self._resolve(file_path, config)
+        try:
+            with open(path, encoding="utf-8", errors="replace", newline="") as f:
+                return FileContent(f.read())
+        except _NOT_A_FILE:
+            return None
+        except OSError as e:
+            raise InvalidPathError(f"Cannot read '{file_path}': {e.strerror}") from e
+
+    def open(self, file_path, state, config):
+        path = self._resolve(file_path, config)
+        try:
+            stat = path.stat()
+        except _NOT_A_FILE:
+            return None
+        except OSError as e:
+            raise InvalidPathError(f"Cannot read '{file_path}': {e.strerror}") from e
+        if not path.is_file():
+            return None
+        if stat.st_size == 0:
+            return FileContent("")
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            index = self._index_cache.get(key)
+            if index is not None:
+                self._index_cache.move_to_end(key)
+        if index is None:
+            try:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    index = MappedFile.build_index(mm)
+            except _NOT_A_FILE:
+                return None
+            except (OSError, ValueError) as e:
+                # mmap raises ValueError if the file was emptied meanwhile
+                raise InvalidPathError(f"Cannot read '{file_path}': {e}") from e
+            with self._lock:
+                self._index_cache[key] = index
+                while len(self._index_cache) > self._index_cache_size:
+                    self._index_cache.popitem(last=False)
+        return MappedFile(path, index, stat.st_size)
+
+    def write(self, file_path, content, state, config):
+        return self.write_files({file_path: content}, state, config)
+
+    def write_files(self, contents, state, config):
+        # Every file goes to a temporary name first, so readers never see a
+        # partial file and a failure before the renames changes nothing. The
+        # renames themselves are not atomic as a group.
+        staged = []
+        try:
+            for file_path, content in contents.items():
+                path = self._resolve(file_path, config)
+                tmp_path = path.with_name(
+                    f".{path.name}.deepagents-{os.getpid()}-{threading.get_ident()}.partial"
+                )
+                staged.append((file_path, tmp_path, path))
+                try:
+                    if path.is_dir():
+                        raise IsADirectoryError(errno.EISDIR, "Is a directory")
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path.write_text(content, encoding="utf-8", errors="surrogatepass", newline="")
+                except OSError as e:
+                    raise InvalidPathError(f"Cannot write '{file_path}': {e.strerror}") from e
+            for file_path, tmp_path, path in staged:
+                try:
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    raise InvalidPathError(f"Cannot write '{file_path}': {e.strerror}") from e
+        finally:
+            for _, tmp_path, _ in staged:
+                with contextlib.suppress(OSError):
+                    tmp_path.unlink(missing_ok=True)
+        return {}
+
+
+class SQLiteBackend(FileBackend):
+    """Keeps files in a SQLite database, one namespace per thread."""
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        per_thread: bool = True,
+        cache_size: int = 64,
+    ):
+        super().__init__()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.per_thread = per_thread
+        self._lock = threading.Lock()
+        # (namespace, path) -> (version, content), so paged reads reuse the line index
+        self._cache: OrderedDict[tuple[str, str], tuple[int, FileContent]] = OrderedDict()
+        self._cache_size = cache_size
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "namespace TEXT NOT NULL, path TEXT NOT NULL, content TEXT NOT NULL, "
+                "size INTEGER NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (namespace, path))"
+            )
+
+    def _namespace(self, config) -> str:
+        return _thread_namespace(config) if self.per_thread else ""
+
+    def ls(self, state, config):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE namespace = ? ORDER BY path",
+                (self._namespace(config),),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_files(self, state, config, prefix="", start="", batch_size=256):
+        # Pages through the primary key index instead of loading every path
+        namespace = self._namespace(config)
+        # Smallest string greater than every string starting with `prefix`
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else chr(0x10FFFF)
+        position = max(prefix, start)
+        inclusive = True
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT path, size FROM files WHERE namespace = ? "
+                    f"AND path {'>=' if inclusive else '>'} ? AND path < ? "
+                    "ORDER BY path LIMIT ?",
+                    (namespace, position, end, batch_size),
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            position, inclusive = rows[-1][0], False
+
+    def file_versions(self, state, config):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, version FROM files WHERE namespace = ?",
+                (self._namespace(config),),
+            ).fetchall()
+        return dict(rows)
+
+    def read(self, file_path, state, config):
+        key = (self._namespace(config), file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM files WHERE namespace = ? AND path = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == row[0]:
+                self._cache.move_to_end(key)
+                return cached[1]
+            row = self._conn.execute(
+                "SELECT version, content FROM files WHERE namespace = ? AND path = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            content = FileContent(row[1])
+            self._remember(key, row[0], content)
+        return content
+
+    def write(self, file_path, content, state, config):
+        return self.write_files({file_path: content}, state, config)
+
+    def write_files(self, contents, state, config):
+        namespace = self._namespace(config)
+        written = []
+        with self._lock:
+            # One transaction, so either every file is written or none is
+            with self._conn:
+                for file_path, content in contents.items():
+                    key = (namespace, file_path)
+                    self._conn.execute(
+                        "INSERT INTO files (namespace, path, content, size, version) VALUES (?, ?, ?, ?, 1) "
+                        "ON CONFLICT (namespace, path) DO UPDATE SET "
+                        "content = excluded.content, size = excluded.size, version = files.version + 1",
+                        (*key, str(content), len(content)),
+                    )
+                    version = self._conn.execute(
+                        "SELECT version FROM files WHERE namespace = ? AND path = ?", key
+                    ).fetchone()[0]
+                    written.append((key, version, content))
+            # Only once committed, so the cache never holds a rolled back version
+            for key, version, content in written:
+                self._cache.pop(key, None)
+                if isinstance(content, FileContent):
+                    self._remember(key, version, content)
+        return {}
+
+    def _remember(self, key, version, content) -> None:
+        self._cache[key] = (version, content)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,202 @@
+"""Running a deep agent over many inputs, with resumable progress.
+
+Results are appended to a JSONL file as each run finishes, one line per run.
+That file is also the progress record: running the same batch again skips
+inputs that already have a successful result.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterable, Callable, Iterable, Iterator, Literal, Optional, Union
+
+from langchain_core.runnables import RunnableConfig
+from typing_extensions import NotRequired, TypedDict
+
+from deepagents.backends import FileBackend, StateBackend
+
+# A user message, or a dict with an optional "id" and either an "input" state
+# or the state's keys themselves (e.g. "messages" and "files")
+BatchItem = Union[str, dict[str, Any]]
+PathLike = Union[str, os.PathLike]
+
+
+class BatchResult(TypedDict):
+    id: str
+    status: Literal["success", "error", "interrupted"]
+    # Seconds the run took
+    duration: float
+    # Text of the final message
+    output: NotRequired[str]
+    # Final contents of every file
+    files: NotRequired[dict[str, str]]
+    error: NotRequired[str]
+
+
+def read_jsonl(path: PathLike) -> Iterator[Any]:
+    """Yield the values in a JSONL file one line at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def completed_ids(results_path: PathLike) -> set[str]:
+    """Ids with a successful result in `results_path` (empty if it does not exist)."""
+    if not os.path.exists(results_path):
+        return set()
+    done = set()
+    for result in read_jsonl(results_path):
+        if result.get("status") == "success":
+            done.add(result["id"])
+    return done
+
+
+def _default_input(item: BatchItem) -> dict[str, Any]:
+    if isinstance(item, str):
+        return {"messages": [{"role": "user", "content": item}]}
+    if "input" in item:
+        return item["input"]
+    return {k: v for k, v in item.items() if k != "id"}
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+    )
+
+
+async def _aiter(inputs: Union[Iterable[BatchItem], AsyncIterable[BatchItem]]):
+    if hasattr(inputs, "__aiter__"):
+        async for item in inputs:
+            yield item
+    else:
+        for item in inputs:
+            yield item
+
+
+async def arun_batch(
+    agent: Any,
+    inputs: Union[PathLike, Iterable[BatchItem], AsyncIterable[BatchItem]],
+    results_path: PathLike,
+    max_concurrency: int = 8,
+    config: Optional[RunnableConfig] = None,
+    file_backend: Optional[FileBackend] = None,
+    to_input: Callable[[BatchItem], dict[str, Any]] = _default_input,
+    thread_prefix: str = "batch",
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+) -> dict[str, int]:
+    """Run `agent` on every input, at most `max_concurrency` at a time.
+
+    Args:
+        agent: The agent from `create_deep_agent` (or a `DeepAgentFactory`).
+        inputs: A JSONL file path, or an (async) iterable of items. Items are
+            read only as slots free up, so a long input stream is never
+            loaded at once. An item's id is its "id" key, or its position.
+        results_path: JSONL file each `BatchResult` is appended to as soon as
+            its run finishes. Inputs that already have a successful result in
+            it are skipped, so an interrupted batch can simply be run again.
+        max_concurrency: Maximum number of runs in progress.
+        config: Config for every run. Each run gets the thread id
+            `<thread_prefix>:<id>`; if the agent has a checkpointer, a run that
+            was cut off part way is resumed from its last checkpoint.
+        file_backend: The agent's file backend, used to read the final files.
+            Defaults to a `DeepAgentFactory`'s own backend, or else the
+            `files` state key; an agent using a blob store needs its backend
+            here, or its runs are recorded as errors.
+        to_input: Turns an item into the agent's input.
+        on_result: Called with each result after it is written.
+
+    Returns:
+        Counts of "success", "error", "interrupted" and "skipped" runs.
+    """
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = read_jsonl(inputs)
+    file_backend = file_backend or getattr(agent, "file_backend", None) or StateBackend()
+    done = completed_ids(results_path)
+    counts = {"success": 0, "error": 0, "interrupted": 0, "skipped": 0}
+    checkpointer = getattr(agent, "checkpointer", None)
+
+    async def run(item_id: str, item: BatchItem) -> BatchResult:
+        run_config = {
+            **(config or {}),
+            "configurable": {
+                **(config or {}).get("configurable", {}),
+                "thread_id": f"{thread_prefix}:{item_id}",
+            },
+        }
+        start = time.perf_counter()
+        try:
+            values = None
+            if checkpointer:
+                snapshot = await agent.aget_state(run_config)
+                if snapshot.next:
+                    # Cut off part way last time: continue from the checkpoint
+                    values = await agent.ainvoke(None, run_config)
+                elif snapshot.values:
+                    # Finished last time, but its result wasn't written
+                    values = snapshot.values
+            if values is None:
+                values = await agent.ainvoke(to_input(item), run_config)
+            files = {}
+            for path in sorted(file_backend.ls(values, run_config)):
+                content = file_backend.read(path, values, run_config)
+                if content is not None:
+                    files[path] = str(content)
+        except Exception as e:
+            return {
+                "id": item_id,
+                "status": "error",
+                "duration": time.perf_counter() - start,
+                "error": repr(e),
+            }
+        messages = values.get("messages") or []
+        return {
+            "id": item_id,
+            "status": "interrupted" if values.get("__interrupt__") else "success",
+            "duration": time.perf_counter() - start,
+            "output": _message_text(messages[-1]) if messages else "",
+            "files": files,
+        }
+
+    with open(results_path, "a", encoding="utf-8") as out:
+
+        def record(result: BatchResult) -> None:
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            counts[result["status"]] += 1
+            if on_result is not None:
+                on_result(result)
+
+        pending: set[asyncio.Task] = set()
+        try:
+            position = 0
+            async for item in _aiter(inputs):
+                item_id = str(item.get("id", position)) if isinstance(item, dict) else str(position)
+                position += 1
+                if item_id in done:
+                    counts["skipped"] += 1
+                    continue
+                if len(pending) >= max_concurrency:
+                    # Backpressure: read the next item only once a run finishes
+                    finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        record(task.result())
+                pending.add(asyncio.create_task(run(item_id, item)))
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    record(task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+    return counts
+
+
+def run_batch(*args: Any, **kwargs: Any) -> dict[str, int]:
+    """Synchronous version of `arun_batch`."""
+    return asyncio.run(arun_batch(*args, **kwargs))
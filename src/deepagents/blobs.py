@@ -0,0 +1,197 @@
+"""Content-addressed storage for file bodies.
+
+With a blob store, the `files` in agent state hold small `BlobRef`s (a content
+hash and a size) instead of the file contents. The bodies are written once to
+the store, deduplicated by hash across steps and threads, and only loaded when
+a tool actually reads them.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from typing_extensions import TypedDict
+
+from deepagents.files import FileContent, content_digest
+
+
+class BlobRef(TypedDict):
+    """Reference to a file body kept in a `BlobStore`."""
+
+    blob: str
+    size: int
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "blob" in value
+
+
+class BlobStore:
+    """Base class for blob stores.
+
+    Subclasses implement `_read`, `_write` and `_contains`. Loaded bodies are
+    kept in a small LRU cache as `FileContent`, so repeated paged reads of the
+    same file reuse its line index.
+    """
+
+    def __init__(self, cache_size: int = 128):
+        self._cache: OrderedDict[str, FileContent] = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def put(self, content: str) -> BlobRef:
+        """Store `content` (if not already stored) and return a reference to it."""
+        digest = content.digest if isinstance(content, FileContent) else content_digest(content)
+        if not self._contains(digest):
+            self._write(digest, content)
+        if isinstance(content, FileContent):
+            self._remember(digest, content)
+        return BlobRef(blob=digest, size=len(content))
+
+    def get(self, ref: Union[BlobRef, str]) -> Optional[FileContent]:
+        """Load the body for a reference (or a bare digest), or None if missing."""
+        digest = ref["blob"] if isinstance(ref, dict) else ref
+        with self._lock:
+            content = self._cache.get(digest)
+            if content is not None:
+                self._cache.move_to_end(digest)
+                return content
+        content = self._read(digest)
+        if content is None:
+            return None
+        content = FileContent(content)
+        self._remember(digest, content)
+        return content
+
+    def resolve(self, value: Union[BlobRef, str]) -> Optional[str]:
+        """Return the body for a `files` value, which may be a ref or inline text."""
+        if is_blob_ref(value):
+            return self.get(value)
+        return value
+
+    def resolve_files(self, files: dict[str, Any]) -> dict[str, str]:
+        """Return a copy of a `files` dict with every reference replaced by its body."""
+        return {path: self.resolve(value) for path, value in files.items()}
+
+    def _remember(self, digest: str, content: FileContent) -> None:
+        with self._lock:
+            self._cache[digest] = content
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _read(self, digest: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _write(self, digest: str, content: str) -> None:
+        raise NotImplementedError
+
+    def _contains(self, digest: str) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryBlobStore(BlobStore):
+    """Keeps blobs in process memory. Share one instance across agents to dedupe."""
+
+    def __init__(self):
+        super().__init__(cache_size=0)
+        self._blobs: dict[str, FileContent] = {}
+
+    def get(self, ref: Union[BlobRef, str]) -> Optional[FileContent]:
+        digest = ref["blob"] if isinstance(ref, dict) else ref
+        return self._blobs.get(digest)
+
+    def _remember(self, digest: str, content: FileContent) -> None:
+        # Keep the indexed copy so later reads reuse its line offsets
+        self._blobs[digest] = content
+
+    def _read(self, digest: str) -> Optional[str]:
+        return self._blobs.get(digest)
+
+    def _write(self, digest: str, content: str) -> None:
+        if not isinstance(content, FileContent):
+            content = FileContent(content)
+        self._blobs[digest] = content
+
+    def _contains(self, digest: str) -> bool:
+        return digest in self._blobs
+
+
+class LocalDirectoryBlobStore(BlobStore):
+    """Keeps each blob as a file named by its hash under `root`."""
+
+    def __init__(self, root: Union[str, os.PathLike], cache_size: int = 128):
+        super().__init__(cache_size=cache_size)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def _read(self, digest: str) -> Optional[str]:
+        try:
+            # newline="" keeps "\r\n" and "\r" as written, so the body still
+            # matches its hash
+            with open(self._path(digest), encoding="utf-8", errors="surrogatepass", newline="") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, digest: str, content: str) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temporary name first so readers never see a partial blob
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(content, encoding="utf-8", errors="surrogatepass", newline="")
+        os.replace(tmp_path, path)
+
+    def _contains(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+
+class SQLiteBlobStore(BlobStore):
+    """Keeps blobs in a single SQLite table."""
+
+    def __init__(self, path: Union[str, os.PathLike], cache_size: int = 128):
+        super().__init__(cache_size=cache_size)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, content TEXT NOT NULL)"
+            )
+
+    def _read(self, digest: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT content FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        content = row[0]
+        if isinstance(content, bytes):
+            return content.decode("utf-8", "surrogatepass")
+        return content
+
+    def _write(self, digest: str, content: str) -> None:
+        value = str(content)
+        try:
+            value.encode("utf-8")
+        except UnicodeEncodeError:
+            # sqlite3 can't bind text with lone surrogates; keep the raw bytes
+            value = value.encode("utf-8", "surrogatepass")
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, content) VALUES (?, ?)",
+                (digest, value),
+            )
+
+    def _contains(self, digest: str) -> bool:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+        return row is not None
@@ -0,0 +1,83 @@
+"""Anthropic prompt caching for the static part of every request.
+
+Anthropic caches a request's prefix in the order tools, system prompt,
+messages. A cache breakpoint at the end of the system prompt therefore caches
+the tool schemas and the system prompt together, which are identical on every
+turn of every thread.
+"""
+
+import threading
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.outputs import LLMResult
+
+
+def cached_system_prompt(prompt: str) -> SystemMessage:
+    """Return `prompt` as a system message with a cache breakpoint at its end."""
+    return SystemMessage(
+        content=[{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+    )
+
+
+def supports_prompt_caching(model: Any) -> bool:
+    """Whether `model` (an instance, a model name or `init_chat_model` settings) is an Anthropic chat model."""
+    if isinstance(model, dict):
+        if "model_provider" in model:
+            return model["model_provider"] == "anthropic"
+        model = model.get("model", "")
+    if isinstance(model, str):
+        return model.startswith(("anthropic:", "claude"))
+    tiers = getattr(model, "tiers", None)
+    if isinstance(tiers, dict):
+        # A ModelRouter: only if every model it routes to supports it
+        return all(supports_prompt_caching(m) for m in tiers.values())
+    # Unwrap models with bound tools or settings. Checked by module name, so
+    # that langchain_anthropic is not imported just for this.
+    model = getattr(model, "bound", model)
+    return any(cls.__module__.split(".")[0] == "langchain_anthropic" for cls in type(model).__mro__)
+
+
+class PromptCacheUsage(BaseCallbackHandler):
+    """Callback handler that adds up prompt cache usage across model calls.
+
+    Pass it in the `callbacks` of the config when invoking an agent. Callbacks
+    are inherited by subagents, so their model calls are counted too.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                with self._lock:
+                    self.calls += 1
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.cache_read_tokens += details.get("cache_read", 0) or 0
+                    self.cache_creation_tokens += details.get("cache_creation", 0) or 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """Share of input tokens that were read from the cache."""
+        with self._lock:
+            return self.cache_read_tokens / self.input_tokens if self.input_tokens else None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_creation_tokens": self.cache_creation_tokens,
+                "hit_rate": self.cache_read_tokens / self.input_tokens if self.input_tokens else None,
+            }
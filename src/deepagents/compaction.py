@@ -0,0 +1,189 @@
+"""Keeping the message history within a token budget."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.language_models import LanguageModelLike
+from langchain_core.messages import (
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from typing_extensions import NotRequired, TypedDict
+
+from deepagents.backends import FileBackend, StateBackend
+from deepagents.prompts import COMPACTION_SUMMARY_PROMPT
+
+EVICTED_TOOL_RESULT = (
+    "[This tool result ({size} characters) was removed from the conversation to save "
+    "context. It is saved in the file '{path}'; use read_file to see it again.]"
+)
+
+
+class CompactionConfig(TypedDict):
+    """Settings for `create_compaction_hook`."""
+
+    # Compact once the history is estimated to be over this many tokens
+    max_tokens: int
+    # Compact down to this many tokens. Defaults to 3/4 of `max_tokens`
+    target_tokens: NotRequired[int]
+    # The most recent messages are never compacted. Defaults to 6
+    keep_last: NotRequired[int]
+    # Tool results shorter than this many characters are left in place. Defaults to 1000
+    min_result_chars: NotRequired[int]
+    # Counts the tokens of a list of messages. Defaults to an approximate count
+    token_counter: NotRequired[Callable[[Sequence[BaseMessage]], int]]
+    # If set, and evicting tool results is not enough, older messages are
+    # replaced by a summary written by this model
+    summary_model: NotRequired[LanguageModelLike]
+
+
+def tool_result_path(tool_call_id: str, attempt: int = 0) -> str:
+    """Path of the file a tool result is moved to.
+
+    `attempt` numbers the alternatives used when that file is already taken.
+    """
+    if attempt:
+        return f"tool_results/{tool_call_id}.{attempt}.txt"
+    return f"tool_results/{tool_call_id}.txt"
+
+
+def create_compaction_hook(
+    config: CompactionConfig,
+    backend: Optional[FileBackend] = None,
+) -> Callable:
+    """Create a pre model hook that keeps the message history within a token budget.
+
+    Token counts are cached per message, so each call only counts the messages
+    added since the last one. Once the history is over `max_tokens`, the
+    oldest tool results (outside the last `keep_last` messages) are moved into
+    files, through `backend`, and replaced by a note with the file's path,
+    until the history is under `target_tokens`. If that is not enough and a
+    `summary_model` is configured, the older messages are summarized.
+
+    Args:
+        config: The compaction settings.
+        backend: The FileBackend evicted tool results are written to. Defaults
+            to the `files` state key.
+    """
+    max_tokens = config["max_tokens"]
+    target_tokens = config.get("target_tokens", max_tokens * 3 // 4)
+    keep_last = config.get("keep_last", 6)
+    min_result_chars = config.get("min_result_chars", 1000)
+    token_counter = config.get("token_counter", count_tokens_approximately)
+    summary_model = config.get("summary_model")
+    backend = backend or StateBackend()
+
+    # (message id, content length) -> tokens. A compacted message keeps its id
+    # but not its length, so it is counted again
+    counts: OrderedDict[tuple, int] = OrderedDict()
+    counts_lock = threading.Lock()
+    max_cached = 100_000
+
+    def count(message: BaseMessage) -> int:
+        key = (message.id or id(message), len(str(message.content)))
+        with counts_lock:
+            tokens = counts.get(key)
+            if tokens is not None:
+                counts.move_to_end(key)
+                return tokens
+        tokens = token_counter([message])
+        with counts_lock:
+            counts[key] = tokens
+            while len(counts) > max_cached:
+                counts.popitem(last=False)
+        return tokens
+
+    def summarize(messages: list[AnyMessage]) -> HumanMessage:
+        response = summary_model.invoke(
+            [*messages, HumanMessage(COMPACTION_SUMMARY_PROMPT)]
+        )
+        text = response.text
+        # A method in older langchain-core versions
+        text = text if isinstance(text, str) else text()
+        return HumanMessage(f"Summary of the conversation so far:\n\n{text}")
+
+    def save(
+        message: ToolMessage, state: dict[str, Any], config: RunnableConfig, files: dict[str, Any]
+    ) -> tuple[str, int]:
+        """Return (path, size) of a file holding the full result, writing it if needed."""
+        spilled = message.response_metadata.get("spilled")
+        if spilled:
+            # The full output is already in a file; the message is only a preview
+            return spilled["path"], spilled["size"]
+        attempt = 0
+        while True:
+            path = tool_result_path(message.tool_call_id, attempt)
+            if path not in files:
+                existing = backend.read(path, state, config)
+                if existing is None:
+                    files.update(backend.write(path, message.content, state, config))
+                    return path, len(message.content)
+                if existing == message.content:
+                    return path, len(message.content)
+            # Never overwrite another file
+            attempt += 1
+
+    def compaction_hook(state: dict[str, Any], config: RunnableConfig) -> Optional[dict[str, Any]]:
+        """Pre model hook that evicts old tool results (and summarizes) when over budget."""
+        messages = list(state.get("messages", []))
+        sizes = [count(m) for m in messages]
+        total = sum(sizes)
+        if total <= max_tokens:
+            return None
+
+        protected = max(len(messages) - keep_last, 0)
+        replaced: list[AnyMessage] = []
+        files: dict[str, Any] = {}
+        for i in range(protected):
+            if total <= target_tokens:
+                break
+            message = messages[i]
+            if (
+                not isinstance(message, ToolMessage)
+                or not isinstance(message.content, str)
+                or len(message.content) < min_result_chars
+                or message.response_metadata.get("compacted")
+            ):
+                continue
+            path, size = save(message, state, config, files)
+            stub = ToolMessage(
+                EVICTED_TOOL_RESULT.format(size=size, path=path),
+                id=message.id,
+                tool_call_id=message.tool_call_id,
+                name=message.name,
+                status=message.status,
+                response_metadata={**message.response_metadata, "compacted": True},
+            )
+            messages[i] = stub
+            replaced.append(stub)
+            total -= sizes[i] - count(stub)
+
+        update: dict[str, Any] = {}
+        if files:
+            update["files"] = files
+        if total > target_tokens and summary_model is not None:
+            # Cut where no tool result is separated from its tool call
+            cut = protected
+            while 0 < cut < len(messages) and isinstance(messages[cut], ToolMessage):
+                cut -= 1
+            if cut > 0:
+                summary = summarize(messages[:cut])
+                update["messages"] = [
+                    RemoveMessage(id=REMOVE_ALL_MESSAGES),
+                    summary,
+                    *messages[cut:],
+                ]
+                return update
+        if replaced:
+            # Messages with the same id replace the originals in place
+            update["messages"] = replaced
+        return update or None
+
+    return compaction_hook
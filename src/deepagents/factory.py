@@ -0,0 +1,133 @@
+"""Compiling a deep agent once and serving many differently configured requests with it."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.graph.state import CompiledStateGraph
+
+from deepagents.backends import FileBackend, StateBackend
+from deepagents.graph import BUILTIN_TOOL_NAMES, create_deep_agent
+from deepagents.instructions import ConfigurablePrompt
+from deepagents.model import get_default_model
+from deepagents.sub_agent import SubAgent, _as_tool
+
+# Key in `config["configurable"]` holding the names of the tools a run may use
+TOOLS_KEY = "tools"
+
+
+def _tool_name(tool_: Union[BaseTool, Callable, dict[str, Any]]) -> str:
+    if isinstance(tool_, dict):
+        # Provider tool specs, e.g. {"name": ...} or {"function": {"name": ...}}
+        return tool_.get("name") or tool_.get("function", {}).get("name", "")
+    return _as_tool(tool_).name
+
+
+class DeepAgentFactory:
+    """Builds deep agents once and picks one per request from its config.
+
+    Takes the arguments of `create_deep_agent`, with `instructions` being the
+    default. Requests choose their own through the config:
+
+        factory = DeepAgentFactory(tools, "You are a helpful assistant.", subagents=...)
+        factory.invoke(
+            {"messages": [...]},
+            {"configurable": {"instructions": tenant_instructions, "tools": ["internet_search", "read_file"]}},
+        )
+
+    `instructions` are read by the system prompt at every model call, so they
+    need no separate graph. `tools` (names of your tools and of built-in
+    tools) selects a subset; a graph is compiled the first time a subset is
+    used and then reused. Subagents only get the tools in the subset too, and
+    the `task` tool is always available.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Union[BaseTool, Callable, dict[str, Any]]],
+        instructions: str = "",
+        max_agents: int = 64,
+        **kwargs: Any,
+    ):
+        if "model" not in kwargs or kwargs["model"] is None:
+            # Shared by every compiled agent, so their subagent graphs are too
+            kwargs["model"] = get_default_model()
+        self.tools = list(tools)
+        self.instructions = ConfigurablePrompt(instructions)
+        self.max_agents = max_agents
+        self._kwargs = kwargs
+        self._tools_by_name = {_tool_name(t): t for t in self.tools}
+        builtin_tools = kwargs.pop("builtin_tools", None)
+        # An empty list means no built-in tools, not the default
+        self._builtin_tools = list(BUILTIN_TOOL_NAMES if builtin_tools is None else builtin_tools)
+        self._agents: OrderedDict[Optional[frozenset[str]], CompiledStateGraph] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def file_backend(self) -> Optional[FileBackend]:
+        """The backend the agents keep files in, if not the default."""
+        blob_store = self._kwargs.get("blob_store")
+        if blob_store is not None:
+            return StateBackend(blob_store)
+        return self._kwargs.get("file_backend")
+
+    @property
+    def tool_names(self) -> list[str]:
+        """Names a request can select from."""
+        return list(self._tools_by_name) + self._builtin_tools
+
+    def get_agent(self, tools: Optional[Iterable[str]] = None) -> CompiledStateGraph:
+        """Return the compiled agent with only the `tools` given by name (None: all)."""
+        key = frozenset(tools) - {"task"} if tools is not None else None
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                return agent
+            if key is None:
+                agent = self._create(self.tools, self._builtin_tools, self._kwargs.get("subagents"))
+            else:
+                unknown = key - set(self.tool_names)
+                if unknown:
+                    raise ValueError(
+                        f"Unknown tools {sorted(unknown)}; the available tools are {self.tool_names}"
+                    )
+                subagents = [
+                    {**s, "tools": [t for t in s["tools"] if t in key]} if "tools" in s else s
+                    for s in self._kwargs.get("subagents") or []
+                ]
+                agent = self._create(
+                    [t for name, t in self._tools_by_name.items() if name in key],
+                    [name for name in self._builtin_tools if name in key],
+                    subagents,
+                )
+            self._agents[key] = agent
+            while len(self._agents) > self.max_agents:
+                self._agents.popitem(last=False)
+            return agent
+
+    def _create(self, tools, builtin_tools: list[str], subagents: Optional[list[SubAgent]]) -> CompiledStateGraph:
+        return create_deep_agent(
+            tools,
+            self.instructions,
+            **{**self._kwargs, "builtin_tools": builtin_tools, "subagents": subagents},
+        )
+
+    def agent_for(self, config: Optional[RunnableConfig] = None) -> CompiledStateGraph:
+        """Return the compiled agent for the tools selected in `config`."""
+        configurable = (config or {}).get("configurable") or {}
+        return self.get_agent(configurable.get(TOOLS_KEY))
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.agent_for(config).invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self.agent_for(config).ainvoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        return self.agent_for(config).stream(input, config, **kwargs)
+
+    def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        return self.agent_for(config).astream(input, config, **kwargs)
@@ -0,0 +1,243 @@
+"""Line-indexed file contents for the virtual filesystem."""
+
+import hashlib
+import re
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Mapping, Optional
+
+# The same line boundaries `str.splitlines` uses.
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _scan_lines(text: str, start: int, end: int) -> tuple[list[int], list[int]]:
+    """Return the start and end offsets of the lines in `text[start:end]`.
+
+    `start` must be the beginning of a line. End offsets exclude the line break.
+    """
+    starts, ends = [], []
+    pos = start
+    for match in _LINE_BREAK.finditer(text, start, end):
+        starts.append(pos)
+        ends.append(match.start())
+        pos = match.end()
+    if pos < end:
+        starts.append(pos)
+        ends.append(end)
+    return starts, ends
+
+
+def content_digest(text: str) -> str:
+    """SHA-256 hex digest of a file's text (use `FileContent.digest` when possible)."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class FileContent(str):
+    """The contents of a file in the virtual filesystem.
+
+    Behaves exactly like a `str`, but also keeps an index of where each line
+    starts and ends. The index is built the first time it is needed and is
+    carried over incrementally by `splice`, so reading a window of lines only
+    touches that window instead of splitting the whole file.
+    """
+
+    __slots__ = ("_starts", "_ends", "_digest")
+
+    def __new__(cls, text: str = "", _index: Optional[tuple[list[int], list[int]]] = None):
+        obj = super().__new__(cls, text)
+        obj._starts, obj._ends = _index if _index is not None else (None, None)
+        obj._digest = None
+        return obj
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the contents, computed once."""
+        if self._digest is None:
+            self._digest = content_digest(self)
+        return self._digest
+
+    def _index(self) -> tuple[list[int], list[int]]:
+        if self._starts is None:
+            self._starts, self._ends = _scan_lines(self, 0, len(self))
+        return self._starts, self._ends
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counted the way `str.splitlines` does."""
+        return len(self._index()[0])
+
+    def read_lines(
+        self, offset: int, limit: int, max_length: Optional[int] = None
+    ) -> list[str]:
+        """Return up to `limit` lines starting at line `offset` (0-based).
+
+        Lines longer than `max_length` characters are truncated.
+        """
+        starts, ends = self._index()
+        lines = []
+        for start, end in zip(starts[offset : offset + limit], ends[offset : offset + limit]):
+            if max_length is not None:
+                end = min(end, start + max_length)
+            lines.append(self[start:end])
+        return lines
+
+    def line_number(self, offset: int) -> int:
+        """Return the (0-based) line containing character `offset`."""
+        starts, _ = self._index()
+        return max(bisect_right(starts, offset) - 1, 0)
+
+    def splice(self, start: int, end: int, text: str) -> "FileContent":
+        """Return a copy with `self[start:end]` replaced by `text`.
+
+        If this file has already been indexed, only the lines touched by the
+        replacement are rescanned; the offsets of later lines are shifted.
+        """
+        content = self[:start] + text + self[end:]
+        if not self._starts:
+            return FileContent(content)
+        starts, ends = self._starts, self._ends
+        # Rescan from one line before the edit, so that a "\r" left at the end
+        # of that line can merge with a "\n" inserted at the start of the next.
+        first = max(bisect_right(starts, start) - 2, 0)
+        last = max(bisect_right(starts, end) - 1, 0)
+        delta = len(text) - (end - start)
+        seg_start = starts[first]
+        seg_end = starts[last + 1] + delta if last + 1 < len(starts) else len(content)
+        seg_starts, seg_ends = _scan_lines(content, seg_start, seg_end)
+        new_starts = starts[:first] + seg_starts + [s + delta for s in starts[last + 1 :]]
+        new_ends = ends[:first] + seg_ends + [e + delta for e in ends[last + 1 :]]
+        return FileContent(content, _index=(new_starts, new_ends))
+
+
+class FileMap(dict):
+    """The `files` channel value: a path -> `FileContent` mapping.
+
+    `file_reducer` builds a new one for every update with `updated`, so a
+    value that was handed out (to a checkpoint or a stream) never changes.
+    That copies a reference per path, but never the contents themselves, so
+    a write still costs time proportional to the number of files (about
+    10-15 µs per thousand files); it has to stay a plain `dict` for checkpoint
+    serialization. It also keeps its paths in sorted order (built on first
+    use, then updated per insert/delete) for prefix listing. Versions share
+    that list until one of them adds or removes a path.
+    """
+
+    _sorted_paths: Optional[list[str]] = None
+    # Whether `_sorted_paths` is shared with another version, and must be
+    # copied before it changes
+    _sorted_shared = False
+
+    def apply(self, delta: dict[str, Optional[str]]) -> None:
+        """Apply a files delta. A `None` content is a tombstone deleting the path."""
+        for path, content in delta.items():
+            if content is None:
+                self.pop(path, None)
+            elif isinstance(content, str) and not isinstance(content, FileContent):
+                self[path] = FileContent(content)
+            else:
+                # Already indexed, or a reference into a blob store
+                self[path] = content
+
+    def updated(self, delta: dict[str, Optional[str]]) -> "FileMap":
+        """Return a new map with `delta` applied, leaving this one unchanged."""
+        files = FileMap(self)
+        if self._sorted_paths is not None:
+            files._sorted_paths = self._sorted_paths
+            files._sorted_shared = self._sorted_shared = True
+        files.apply(delta)
+        return files
+
+    def sorted_paths(self) -> list[str]:
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self)
+        return self._sorted_paths
+
+    def _own_sorted_paths(self) -> Optional[list[str]]:
+        """The sorted path list, copied first if another version shares it."""
+        if self._sorted_shared:
+            self._sorted_paths = list(self._sorted_paths)
+            self._sorted_shared = False
+        return self._sorted_paths
+
+    def _unlist(self, path) -> None:
+        sorted_paths = self._own_sorted_paths()
+        if sorted_paths is not None:
+            del sorted_paths[bisect_left(sorted_paths, path)]
+
+    def __setitem__(self, path, content):
+        if path not in self:
+            sorted_paths = self._own_sorted_paths()
+            if sorted_paths is not None:
+                insort(sorted_paths, path)
+        super().__setitem__(path, content)
+
+    def __delitem__(self, path):
+        super().__delitem__(path)
+        self._unlist(path)
+
+    def pop(self, path, *default):
+        if path in self:
+            content = super().pop(path)
+            self._unlist(path)
+            return content
+        return super().pop(path, *default)
+
+    def update(self, *args, **kwargs):
+        for path, content in dict(*args, **kwargs).items():
+            self[path] = content
+
+    def setdefault(self, path, default=None):
+        if path not in self:
+            self[path] = default
+        return self[path]
+
+    def popitem(self):
+        path, content = super().popitem()
+        self._unlist(path)
+        return path, content
+
+    def clear(self):
+        super().clear()
+        self._sorted_paths = None
+        self._sorted_shared = False
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __copy__(self):
+        # A copy gets its own path index, built lazily
+        return FileMap(self)
+
+
+class FileOverlay(FileMap):
+    """A copy-on-write view of some of a parent agent's files, for a subagent.
+
+    It holds references to the parent's contents, which are never mutated, so
+    handing files over copies no file contents, and `file_reducer` adopts an
+    overlay as the subagent's `files` as-is. Writes replace entries in the
+    overlay only; `changes` then returns just what the subagent wrote or
+    deleted, as a delta for the parent.
+    """
+
+    def __init__(self, files: Mapping[str, str], paths: Optional[Iterable[str]] = None):
+        origin = {path: files[path] for path in (files if paths is None else paths)}
+        super().__init__(origin)
+        self._origin = origin
+
+    def changes(self, files: Optional[Mapping[str, str]] = None) -> dict[str, Optional[str]]:
+        """Return the delta from the original files to `files` (default: this overlay)."""
+        files = self if files is None else files
+        delta = {}
+        for path, content in files.items():
+            original = self._origin.get(path)
+            if original is not content and original != content:
+                delta[path] = content
+        for path in self._origin:
+            if path not in files:
+                delta[path] = None
+        return delta
+
+
+def file_size(content) -> int:
+    """Size in characters of a `files` value (contents or a blob reference)."""
+    return content["size"] if isinstance(content, dict) else len(content)
@@ -1,17 +1,45 @@
-from deepagents.sub_agent import _create_task_tool, SubAgent
+from deepagents.sub_agent import _create_task_tool, _as_tool, SubAgent
 from deepagents.model import get_default_model
-from deepagents.tools import write_todos, write_file, read_file, ls, edit_file
+from deepagents.tools import write_todos, _get_file_tools
+from deepagents.blobs import BlobStore
+from deepagents.backends import FileBackend, StateBackend
+from deepagents.scheduler import TaskScheduler
+from deepagents.result_cache import ResultCache
 from deepagents.state import DeepAgentState
 from typing import Sequence, Union, Callable, Any, TypeVar, Type, Optional, Dict
-from langchain_core.tools import BaseTool, tool
+from langchain_core.tools import BaseTool
 from langchain_core.language_models import LanguageModelLike
 from deepagents.interrupt import create_interrupt_hook, ToolInterruptConfig
+from deepagents.compaction import create_compaction_hook, CompactionConfig
+from deepagents.spill import spill_large_outputs
+from deepagents.caching import cached_system_prompt, supports_prompt_caching
+from deepagents.instrumentation import Instrumentation
+from deepagents.instructions import ConfigurablePrompt
+from deepagents.registry import ModelRegistry, default_model_registry
+from deepagents.tool_execution import ToolExecution, _react_agent_tools
 from langgraph.types import Checkpointer
 from langgraph.prebuilt import create_react_agent
+import weakref
 
 StateSchema = TypeVar("StateSchema", bound=DeepAgentState)
 StateSchemaType = Type[StateSchema]
 
+# One StateBackend per blob store, so the `blob_store` shorthand reuses tools
+_state_backends: "weakref.WeakKeyDictionary[BlobStore, StateBackend]" = weakref.WeakKeyDictionary()
+
+# Names of the tools that `builtin_tools` can select
+BUILTIN_TOOL_NAMES = (
+    "write_todos",
+    "write_file",
+    "read_file",
+    "read_files",
+    "ls",
+    "edit_file",
+    "multi_edit",
+    "grep",
+    "glob",
+)
+
 base_prompt = """You have access to a number of standard tools
 
 ## `write_todos`
@@ -36,11 +64,23 @@ def create_deep_agent(
     config_schema: Optional[Type[Any]] = None,
     checkpointer: Optional[Checkpointer] = None,
     post_model_hook: Optional[Callable] = None,
+    blob_store: Optional[BlobStore] = None,
+    file_backend: Optional[FileBackend] = None,
+    task_scheduler: Optional[TaskScheduler] = None,
+    task_cache: Optional[ResultCache] = None,
+    pre_model_hook: Optional[Callable] = None,
+    compaction_config: Optional[CompactionConfig] = None,
+    max_tool_output_chars: Optional[int] = 20000,
+    prompt_caching: Optional[bool] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    model_registry: Optional[ModelRegistry] = None,
+    tool_execution: ToolExecution = "parallel",
 ):
     """Create a deep agent.
 
     This agent will by default have access to a tool to write todos (write_todos),
-    and then four file editing tools: write_file, ls, read_file, edit_file.
+    six file editing tools: write_file, ls, read_file, read_files, edit_file,
+    multi_edit, and two file search tools: grep, glob.
 
     Args:
         tools: The additional tools the agent should have access to.
@@ -60,32 +100,119 @@ def create_deep_agent(
         interrupt_config: Optional Dict[str, HumanInterruptConfig] mapping tool names to interrupt configs.
         config_schema: The schema of the deep agent.
         checkpointer: Optional checkpointer for persisting agent state between runs.
+        blob_store: Optional BlobStore for file contents. When set, the `files` in
+            state hold content hashes and the bodies live in the store, so
+            checkpoints do not repeat unchanged files. Shorthand for
+            `file_backend=StateBackend(blob_store)`.
+        file_backend: Optional FileBackend the built-in file tools store files in.
+            Defaults to keeping them in the `files` state key.
+        task_scheduler: Optional TaskScheduler that limits how many `task`
+            subagent calls run at once (globally and per subagent type), rate
+            limits them per model and queues the rest. By default every call
+            starts immediately.
+        task_cache: Optional ResultCache that memoizes `task` results by subagent
+            type, description and a hash of the files the subagent can see. A
+            repeated call returns the stored answer (and re-applies the files
+            the subagent wrote) without running the subagent.
+        pre_model_hook: Optional node to run before each model call, e.g. to trim
+            the message history.
+        compaction_config: Optional CompactionConfig that keeps the message
+            history within a token budget, by moving old tool results into
+            files (and optionally summarizing older messages). Can be used
+            together with interrupt_config.
+        max_tool_output_chars: Results of the given `tools` longer than this many
+            characters are saved to a file (`tool_results/<tool_call_id>.txt`),
+            and the model gets a preview plus the file's path instead. Set to
+            None to always return results in full.
+        prompt_caching: Whether to mark the system prompt (and with it the tool
+            schemas) as cacheable, for the main agent and every subagent, using
+            Anthropic prompt caching. Defaults to on for Anthropic models,
+            including the default model, and off for others.
+        instrumentation: Optional Instrumentation callback handler that records
+            the duration, tokens, state size and (for subagents) queue wait of
+            every model call, tool call and subagent in each run, and passes
+            them to its exporters, e.g. a MetricsAggregator.
+        model_registry: ModelRegistry that creates the models given by name
+            (for `model`) or by dict settings (for subagents), once per distinct
+            settings, with connection pools shared per provider and endpoint.
+            Defaults to `default_model_registry`, shared by all agents.
+        tool_execution: How the tool calls of one AI message run, for the main
+            agent and every subagent. "parallel" (the default) runs them all at
+            once against the same state. "isolated" runs read-only tools and
+            writes to different files at once, but writes to the same file one
+            after another in the order they were called, and tools that are
+            not classified (see `read_only` and `writes_files`) one at a time
+            after the rest.
     """
     
-    prompt = instructions + base_prompt
+    if isinstance(instructions, ConfigurablePrompt):
+        # Instructions chosen per run (see DeepAgentFactory)
+        prompt = instructions._replace(suffix=instructions.suffix + base_prompt)
+    else:
+        prompt = instructions + base_prompt
     
-    all_builtin_tools = [write_todos, write_file, read_file, ls, edit_file]
+    if blob_store is not None and file_backend is not None:
+        raise ValueError(
+            "Cannot specify both blob_store and file_backend together. "
+            "Use file_backend=StateBackend(blob_store) instead."
+        )
+    elif blob_store is not None:
+        file_backend = _state_backends.get(blob_store)
+        if file_backend is None:
+            file_backend = _state_backends[blob_store] = StateBackend(blob_store)
+    (
+        ls,
+        read_file,
+        read_files,
+        write_file,
+        edit_file,
+        multi_edit,
+        grep,
+        glob,
+    ) = _get_file_tools(file_backend)
+    all_builtin_tools = [
+        write_todos,
+        write_file,
+        read_file,
+        read_files,
+        ls,
+        edit_file,
+        multi_edit,
+        grep,
+        glob,
+    ]
     
     if builtin_tools is not None:
         tools_by_name = {}
         for tool_ in all_builtin_tools:
-            if not isinstance(tool_, BaseTool):
-                tool_ = tool(tool_)
+            tool_ = _as_tool(tool_)
             tools_by_name[tool_.name] = tool_
         # Only include built-in tools whose names are in the specified list
         built_in_tools = [ tools_by_name[_tool] for _tool in builtin_tools        ]
     else:
         built_in_tools = all_builtin_tools
     
+    model_registry = model_registry or default_model_registry
     if model is None:
         model = get_default_model()
+    elif isinstance(model, str):
+        model = model_registry.get(model)
     state_schema = state_schema or DeepAgentState
+    if max_tool_output_chars is not None:
+        tools = spill_large_outputs(list(tools), max_tool_output_chars, backend=file_backend)
     task_tool = _create_task_tool(
         list(tools) + built_in_tools,
         instructions,
         subagents or [],
         model,
-        state_schema
+        state_schema,
+        scheduler=task_scheduler,
+        result_cache=task_cache,
+        backend=file_backend,
+        prompt_caching=prompt_caching,
+        instrumented=instrumentation is not None,
+        model_registry=model_registry,
+        tool_execution=tool_execution,
     )
     all_tools = built_in_tools + list(tools) + [task_tool]
     
@@ -102,12 +229,34 @@ def create_deep_agent(
     else:
         selected_post_model_hook = None
     
-    return create_react_agent(
+    if pre_model_hook and compaction_config:
+        raise ValueError(
+            "Cannot specify both pre_model_hook and compaction_config together. "
+            "Use either compaction_config for history compaction or pre_model_hook for custom pre-processing."
+        )
+    elif pre_model_hook is not None:
+        selected_pre_model_hook = pre_model_hook
+    elif compaction_config is not None:
+        selected_pre_model_hook = create_compaction_hook(compaction_config, file_backend)
+    else:
+        selected_pre_model_hook = None
+
+    if prompt_caching or (prompt_caching is None and supports_prompt_caching(model)):
+        if isinstance(prompt, ConfigurablePrompt):
+            prompt = prompt.cached()
+        else:
+            prompt = cached_system_prompt(prompt)
+
+    agent = create_react_agent(
         model,
         prompt=prompt,
-        tools=all_tools,
         state_schema=state_schema,
+        pre_model_hook=selected_pre_model_hook,
         post_model_hook=selected_post_model_hook,
         config_schema=config_schema,
         checkpointer=checkpointer,
+        **_react_agent_tools(all_tools, tool_execution),
     )
+    if instrumentation is not None:
+        agent = agent.with_config(callbacks=[instrumentation])
+    return agent
@@ -0,0 +1,39 @@
+"""System prompts whose instructions are chosen per run, through the config."""
+
+from typing import Any, NamedTuple, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+from deepagents.caching import cached_system_prompt
+
+# Key in `config["configurable"]` holding a run's instructions
+INSTRUCTIONS_KEY = "instructions"
+
+
+class ConfigurablePrompt(NamedTuple):
+    """A prompt that reads its instructions from the config of each model call.
+
+    Used as the `prompt` of a compiled agent, it builds the system message from
+    `config["configurable"]["instructions"]` (or `default` when that is not
+    set) followed by `suffix`, so one compiled graph can serve runs with
+    different instructions. Subagents run with their parent's config, so they
+    see the same instructions.
+    """
+
+    default: str
+    suffix: str = ""
+    # Whether to put an Anthropic cache breakpoint at the end of the prompt
+    cache: bool = False
+
+    def text(self, config: Optional[RunnableConfig]) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        return configurable.get(INSTRUCTIONS_KEY, self.default) + self.suffix
+
+    def cached(self) -> "ConfigurablePrompt":
+        return self._replace(cache=True)
+
+    def __call__(self, state: dict[str, Any], config: RunnableConfig) -> list[BaseMessage]:
+        text = self.text(config)
+        system = cached_system_prompt(text) if self.cache else SystemMessage(text)
+        return [system, *state["messages"]]
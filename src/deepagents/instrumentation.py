@@ -0,0 +1,316 @@
+"""Timing and token accounting for model calls, tool calls and subagents.
+
+`Instrumentation` is a LangChain callback handler. It turns the callbacks of
+a run into `Span` records, one per model call, tool call and `task` subagent
+invocation, and hands each finished span to its exporters: callables taking a
+`Span` (such as `MetricsAggregator`), or objects with `on_start` and `on_end`
+methods (such as `OpenTelemetryExporter`).
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from typing import Any, Callable, Literal, Optional, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from typing_extensions import NotRequired, TypedDict
+
+# Name of the custom callback event the `task` tool sends with its queue wait
+TASK_EVENT = "deepagents_task"
+
+
+class Span(TypedDict):
+    """One timed operation.
+
+    `agent` is the agent that made the call: "main", or the subagent type for
+    calls made inside a subagent. `parent_id` is the id of the enclosing span,
+    e.g. the subagent a model call was made in.
+    """
+
+    id: str
+    parent_id: Optional[str]
+    kind: Literal["model", "tool", "subagent"]
+    # Model name, tool name or subagent type
+    name: str
+    agent: str
+    start_time: float
+    end_time: NotRequired[float]
+    duration: NotRequired[float]
+    status: NotRequired[Literal["success", "error"]]
+    error: NotRequired[str]
+    # Model calls
+    input_tokens: NotRequired[int]
+    output_tokens: NotRequired[int]
+    # Size of the state the call was made with
+    messages: NotRequired[int]
+    files: NotRequired[int]
+    # Subagents: time spent waiting for a TaskScheduler slot, and whether the
+    # result came from the task cache
+    queue_wait: NotRequired[float]
+    cached: NotRequired[bool]
+
+
+SpanExporter = Union[Callable[[Span], None], Any]
+
+
+class Instrumentation(BaseCallbackHandler):
+    """Callback handler that records a `Span` for every model call, tool call and subagent.
+
+    Pass it to `create_deep_agent(instrumentation=...)`, which also makes the
+    `task` tool report queue waits and cache hits, or add it to the
+    `callbacks` of a run's config.
+    """
+
+    # Record spans in the order the callbacks happen, without a thread hop
+    run_inline = True
+
+    def __init__(self, *exporters: SpanExporter):
+        self.exporters = list(exporters)
+        self._spans: dict[UUID, Span] = {}
+        # Parent run of every open run, to find enclosing spans and state
+        self._parents: dict[UUID, Optional[UUID]] = {}
+        # Number of files in the state of open agent nodes
+        self._files: dict[UUID, int] = {}
+        # Top-level run of every open span
+        self._roots: dict[UUID, UUID] = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self.exporters.append(exporter)
+
+    # Runs
+
+    def _nearest(self, run_id: Optional[UUID], records: dict) -> Optional[UUID]:
+        while run_id is not None and run_id not in records:
+            run_id = self._parents.get(run_id)
+        return run_id
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], metadata: Optional[dict], **fields: Any) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            parent = self._nearest(parent_run_id, self._spans)
+            files = self._nearest(parent_run_id, self._files)
+            span: Span = {
+                "id": str(run_id),
+                "parent_id": str(parent) if parent is not None else None,
+                "agent": metadata.get("subagent_type", "main"),
+                "start_time": time.time(),
+                **fields,
+            }
+            if files is not None:
+                span["files"] = self._files[files]
+            self._spans[run_id] = span
+            root = run_id
+            while self._parents.get(root) is not None:
+                root = self._parents[root]
+            self._roots[run_id] = root
+        for exporter in self.exporters:
+            on_start = getattr(exporter, "on_start", None)
+            if on_start is not None:
+                on_start(span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **fields: Any) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            self._roots.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        span["end_time"] = time.time()
+        span["duration"] = span["end_time"] - span["start_time"]
+        span["status"] = "error" if error is not None else "success"
+        if error is not None:
+            span["error"] = repr(error)
+        span.update(fields)
+        for exporter in self.exporters:
+            on_end = getattr(exporter, "on_end", exporter)
+            on_end(span)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            # The state an agent node (main agent or subagent) was called with
+            if (metadata or {}).get("langgraph_node") == "agent" and isinstance(inputs, dict):
+                files = inputs.get("files")
+                if files is not None:
+                    self._files[run_id] = len(files)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            self._files.pop(run_id, None)
+            if parent_run_id is not None:
+                return
+            # Calls that were cancelled (e.g. because a parallel tool call
+            # raised) get no end callback; close them with their run
+            cancelled = [r for r, root in self._roots.items() if root == run_id]
+        for r in cancelled:
+            self._end(r, asyncio.CancelledError())
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self.on_chain_end(None, run_id=run_id, parent_run_id=parent_run_id)
+
+    # Model calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "model"
+        self._start(run_id, parent_run_id, metadata, kind="model", name=name, messages=sum(map(len, messages)))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "model"
+        self._start(run_id, parent_run_id, metadata, kind="model", name=name, messages=len(prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        self._end(run_id, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # Tool calls and subagents
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, inputs=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        if name == "task" and isinstance(inputs, dict) and "subagent_type" in inputs:
+            self._start(run_id, parent_run_id, metadata, kind="subagent", name=inputs["subagent_type"])
+        else:
+            self._start(run_id, parent_run_id, metadata, kind="tool", name=name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name != TASK_EVENT:
+            return
+        with self._lock:
+            span = self._spans.get(run_id)
+            if span is None:
+                # Depending on the langchain-core version, the tool's config
+                # belongs to the tool run or to the run that called it
+                span = next(
+                    (self._spans[r] for r, p in self._parents.items() if p == run_id and r in self._spans),
+                    None,
+                )
+            if span is not None:
+                span.update(data)
+
+
+def _stats(values: list[float]) -> dict[str, float]:
+    return {
+        "total": sum(values),
+        "avg": statistics.fmean(values) if values else 0.0,
+        "p50": statistics.median(values) if values else 0.0,
+        "max": max(values, default=0.0),
+    }
+
+
+class MetricsAggregator:
+    """In-memory span exporter that aggregates spans by kind and name.
+
+    Keeps every span (up to `max_spans`, oldest dropped first) and summarizes
+    counts, durations, queue waits and tokens.
+    """
+
+    def __init__(self, max_spans: Optional[int] = 100_000):
+        self.max_spans = max_spans
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            if self.max_spans is not None and len(self.spans) > self.max_spans:
+                del self.spans[: len(self.spans) - self.max_spans]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def _summarize(self, key: Callable[[Span], tuple]) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        groups: dict[tuple, list[Span]] = {}
+        for span in spans:
+            groups.setdefault(key(span), []).append(span)
+        summary: dict = {}
+        for group_key, group in groups.items():
+            entry = {
+                "count": len(group),
+                "errors": sum(s["status"] == "error" for s in group),
+                "duration": _stats([s["duration"] for s in group]),
+            }
+            if any("queue_wait" in s for s in group):
+                entry["queue_wait"] = _stats([s.get("queue_wait", 0.0) for s in group])
+                entry["cached"] = sum(bool(s.get("cached")) for s in group)
+            if any("input_tokens" in s for s in group):
+                entry["input_tokens"] = sum(s.get("input_tokens", 0) for s in group)
+                entry["output_tokens"] = sum(s.get("output_tokens", 0) for s in group)
+            outer, inner = group_key
+            summary.setdefault(outer, {})[inner] = entry
+        return summary
+
+    def summary(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Stats per kind ("model", "tool", "subagent") and name."""
+        return self._summarize(lambda s: (s["kind"], s["name"]))
+
+    def by_agent(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Stats per calling agent ("main" or a subagent type) and kind."""
+        return self._summarize(lambda s: (s["agent"], s["kind"]))
+
+
+class OpenTelemetryExporter:
+    """Span exporter that reports spans through OpenTelemetry.
+
+    Requires the `opentelemetry-api` package. Uses `tracer`, or one from the
+    global tracer provider. Spans are nested the same way as the runs, e.g.
+    a subagent's model calls are children of its `task` span.
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryExporter requires opentelemetry-api. "
+                "Install it with `pip install opentelemetry-api`."
+            ) from e
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("deepagents")
+        self._open: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self._open.get(span["parent_id"]) if span["parent_id"] else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.tracer.start_span(
+            f"{span['kind']} {span['name']}",
+            context=context,
+            start_time=int(span["start_time"] * 1e9),
+        )
+        with self._lock:
+            self._open[span["id"]] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._open.pop(span["id"], None)
+        if otel_span is None:
+            return
+        for key, value in span.items():
+            if key not in ("id", "parent_id", "start_time", "end_time") and value is not None:
+                otel_span.set_attribute(f"deepagents.{key}", value)
+        if span["status"] == "error":
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.get("error")))
+        otel_span.end(end_time=int(span["end_time"] * 1e9))
@@ -1,5 +1,21 @@
-from langchain_anthropic import ChatAnthropic
+import threading
+
+_default_model = None
+_default_model_lock = threading.Lock()
 
 
 def get_default_model():
-    return ChatAnthropic(model_name="claude-sonnet-4-20250514", max_tokens=64000)
+    """Return the default model, one shared instance per process.
+
+    Sharing it keeps the subagent graphs of agents built on the default model
+    in one cache entry, since model instances are cached by identity.
+    """
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            # Imported here so that `import deepagents` doesn't load the
+            # Anthropic SDK for agents that use other models
+            from langchain_anthropic import ChatAnthropic
+
+            _default_model = ChatAnthropic(model_name="claude-sonnet-4-20250514", max_tokens=64000)
+        return _default_model
@@ -275,3 +275,51 @@ Usage:
 - Results are returned using cat -n format, with line numbers starting at 1
 - You have the capability to call multiple tools in a single response. It is always better to speculatively read multiple files as a batch that are potentially useful. 
 - If you read a file that exists but has empty contents you will receive a system reminder warning in place of file contents."""
+
+GREP_DESCRIPTION = """Searches the contents of files for a regular expression.
+
+Usage:
+- Prefer this tool over reading files one by one when you are looking for something and do not know which file it is in
+- `pattern` is a Python regular expression, e.g. "def \\w+\\(" or "TODO|FIXME". `^` and `$` match at line boundaries
+- Use `path_glob` to only search some files, e.g. "*.md" or "reports/**/*.txt"
+- Use `context_lines` to also show lines before and after each match
+- Results are returned as `path:line_number:line` for matching lines and `path-line_number-line` for context lines, with line numbers starting at 1"""
+
+GLOB_DESCRIPTION = """Finds files whose path matches a glob pattern.
+
+Usage:
+- `*` matches any characters within one path segment, `**` matches across directories, `?` matches a single character
+- For example, "*.md" finds markdown files at the top level and "**/*.md" finds them anywhere
+- Returns a sorted list of matching file paths"""
+
+LS_DESCRIPTION = """Lists files, with their sizes (in characters, or in bytes for files on disk).
+
+Usage:
+- By default lists every file. Use `path_prefix` to only list files under a directory, e.g. "reports/"
+- Set `recursive` to false to list only the direct children of `path_prefix`, with subdirectories shown once as "name/"
+- Use `pattern` to filter paths with a glob, e.g. "*.md" or "**/*.txt"
+- At most `limit` entries are returned. If there are more, the result ends with a cursor; call `ls` again with that `cursor` to get the next page"""
+
+READ_FILES_DESCRIPTION = """Reads several files in a single call. Prefer this over calling `read_file` once per file when you already know which files you need.
+
+Usage:
+- `files` is a list of `{"file_path": ..., "offset": ..., "limit": ...}` entries; `offset` (0-based line) and `limit` are optional, as in `read_file`
+- Each file is returned under a `==> file_path <==` header, using cat -n format with line numbers starting at 1
+- All files share one budget of `max_total_lines` lines and `max_total_chars` characters. If the budget runs out, the result says which offset to continue from and which files were not read"""
+
+MULTI_EDIT_DESCRIPTION = """Performs several exact string replacements in one call, across one or more files. Prefer this over calling `edit_file` repeatedly when you have more than one change to make.
+
+Usage:
+- `edits` is a list of `{"file_path": ..., "old_string": ..., "new_string": ..., "replace_all": ...}` entries, with the same meaning as the `edit_file` parameters
+- Edits are applied in order, and each edit sees the result of the edits before it on the same file
+- The edits are atomic: if any edit fails (file not found, `old_string` not found or not unique), none of them are applied
+- Follow the same rules as `edit_file`: read the file first, and preserve the exact indentation after the line number prefix"""
+
+COMPACTION_SUMMARY_PROMPT = """Summarize the conversation above so that it can replace it, and the work can continue from the summary alone.
+
+Keep:
+- The user's requests and any constraints or preferences they stated
+- Decisions made, results found, and what is still left to do
+- The paths of files that were written or that hold tool results, so they can be read again
+
+Respond with only the summary."""
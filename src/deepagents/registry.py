@@ -0,0 +1,233 @@
+"""Sharing chat models, and their HTTP connection pools, between agents.
+
+Every `init_chat_model` call builds a new model with its own API client, so
+each subagent with dict model settings (and each agent that uses them) would
+open its own connections. A `ModelRegistry` creates one model per distinct
+settings, and gives models for the same provider and endpoint one shared
+connection pool with configurable limits.
+"""
+
+import json
+import logging
+import threading
+from functools import cached_property
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Providers whose chat model classes accept `http_client` and
+# `http_async_client` arguments
+_HTTP_CLIENT_PROVIDERS = {"openai", "azure_openai", "groq", "deepseek", "xai"}
+# The SDK each provider's clients come from
+_SDKS = {
+    "anthropic": "anthropic",
+    "openai": "openai",
+    "azure_openai": "openai",
+    "deepseek": "openai",
+    "xai": "openai",
+    "groq": "groq",
+}
+# The cached properties `ChatAnthropic` builds its API clients with. It takes
+# no client arguments, so the shared clients are stored in their place
+_ANTHROPIC_CLIENT_PROPERTIES = ("_client_params", "_client", "_async_client")
+# Settings that select an API endpoint
+_ENDPOINT_KEYS = ("base_url", "openai_api_base", "anthropic_api_url", "azure_endpoint", "api_base")
+
+
+def _provider(settings: dict[str, Any]) -> Optional[str]:
+    if settings.get("model_provider"):
+        return settings["model_provider"]
+    model = settings.get("model", "")
+    if ":" in model:
+        return model.split(":", 1)[0]
+    if model.startswith(("gpt-", "o1", "o3", "o4")):
+        return "openai"
+    if model.startswith("claude"):
+        return "anthropic"
+    return None
+
+
+class _ConnectionPool:
+    """A sync and an async httpx client for one endpoint, with usage counts.
+
+    New connections are counted through httpcore's "trace" request extension,
+    so every other request went over a reused connection.
+    """
+
+    def __init__(self, sdk: str, limits: dict[str, Any], timeout: Optional[float]):
+        import importlib
+
+        # The SDK's own client classes, so they are of the httpx version the
+        # SDK checks for
+        module = importlib.import_module(sdk)
+        client_cls = module.DefaultHttpxClient
+        async_client_cls = module.DefaultAsyncHttpxClient
+        httpx = importlib.import_module(client_cls.__mro__[1].__module__.split(".")[0])
+
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.client = client_cls(
+            limits=httpx.Limits(**limits),
+            timeout=timeout,
+            event_hooks={"request": [self._on_request]},
+        )
+        self.async_client = async_client_cls(
+            limits=httpx.Limits(**limits),
+            timeout=timeout,
+            event_hooks={"request": [self._aon_request]},
+        )
+
+    def _count(self, event: str) -> None:
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+
+    def _on_request(self, request: Any) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = lambda event, info: self._count(event)
+
+    async def _aon_request(self, request: Any) -> None:
+        with self._lock:
+            self.requests += 1
+
+        async def trace(event: str, info: dict) -> None:
+            self._count(event)
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "reused": max(self.requests - self.connections, 0),
+            }
+
+
+class ModelRegistry:
+    """Creates each distinct chat model once and pools connections per endpoint.
+
+    `get` takes a model name (e.g. "openai:gpt-4o") or `init_chat_model`
+    settings, and returns the same model instance for equal settings. Models
+    for OpenAI-compatible providers and Anthropic share one httpx connection
+    pool per provider and endpoint, limited by `max_connections` and
+    `max_keepalive_connections`; other providers keep their own clients.
+
+    Subagents with dict model settings use the registry passed to
+    `create_deep_agent`, or `default_model_registry`, which is shared by every
+    agent in the process.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 30.0,
+        timeout: Optional[float] = None,
+        share_connections: bool = True,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.share_connections = share_connections
+        self._models: dict[str, Any] = {}
+        self._pools: dict[tuple[str, Optional[str]], _ConnectionPool] = {}
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def get(self, model: Union[str, dict[str, Any]]) -> Any:
+        """Return the chat model for a model name or `init_chat_model` settings."""
+        settings = {"model": model} if isinstance(model, str) else dict(model)
+        key = json.dumps(settings, sort_keys=True, default=repr)
+        with self._lock:
+            instance = self._models.get(key)
+            if instance is not None:
+                self._hits += 1
+                return instance
+            instance = self._models[key] = self._create(settings)
+            return instance
+
+    def _pool(self, provider: str, settings: dict[str, Any]) -> tuple[tuple, _ConnectionPool]:
+        """Return the pool for the settings' endpoint, and its key.
+
+        A new pool is only listed in `stats` once `_pools` holds it, so callers
+        add it after a model actually uses it.
+        """
+        endpoint = next((settings[k] for k in _ENDPOINT_KEYS if settings.get(k)), None)
+        key = (provider, endpoint)
+        pool = self._pools.get(key)
+        if pool is None:
+            limits = {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+            }
+            pool = _ConnectionPool(_SDKS[provider], limits, self.timeout)
+        return key, pool
+
+    def _create(self, settings: dict[str, Any]) -> Any:
+        # Imported here, as it is slow to import and only needed for settings
+        from langchain.chat_models import init_chat_model
+
+        provider = _provider(settings)
+        if not self.share_connections or provider not in _SDKS:
+            return init_chat_model(**settings)
+        try:
+            key, pool = self._pool(provider, settings)
+        except (ImportError, AttributeError):
+            # SDK not installed (init_chat_model will say so) or too old to
+            # provide its client classes
+            return init_chat_model(**settings)
+        if provider in _HTTP_CLIENT_PROVIDERS:
+            instance = init_chat_model(
+                **{"http_client": pool.client, "http_async_client": pool.async_client, **settings}
+            )
+        else:
+            instance = init_chat_model(**settings)
+            if not self._share_anthropic_pool(instance, pool):
+                return instance
+        self._pools.setdefault(key, pool)
+        return instance
+
+    @staticmethod
+    def _share_anthropic_pool(instance: Any, pool: _ConnectionPool) -> bool:
+        """Give a `ChatAnthropic` clients on the shared pool; False if it can't take them."""
+        import anthropic
+
+        cls = type(instance)
+        if all(isinstance(getattr(cls, name, None), cached_property) for name in _ANTHROPIC_CLIENT_PROPERTIES):
+            try:
+                # Stored where the cached properties keep their values, so the
+                # model never builds its own clients
+                params = instance._client_params
+                instance.__dict__["_client"] = anthropic.Client(**params, http_client=pool.client)
+                instance.__dict__["_async_client"] = anthropic.AsyncClient(
+                    **params, http_client=pool.async_client
+                )
+                return True
+            except TypeError:
+                pass
+        logger.warning(
+            "Can't give %s models a shared connection pool with this version of %s; "
+            "they keep their own connections and are left out of ModelRegistry.stats()",
+            cls.__name__,
+            cls.__module__.split(".")[0],
+        )
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        """Model reuse, and requests and new connections per provider and endpoint."""
+        with self._lock:
+            pools = dict(self._pools)
+            stats = {"models": len(self._models), "hits": self._hits}
+        stats["endpoints"] = {
+            f"{provider} {endpoint or 'default'}": pool.stats()
+            for (provider, endpoint), pool in pools.items()
+        }
+        return stats
+
+
+default_model_registry = ModelRegistry()
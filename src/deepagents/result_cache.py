@@ -0,0 +1,201 @@
+"""Memoized `task` subagent results.
+
+With a result cache, a `task` call with the same subagent type, the same
+description (ignoring whitespace differences) and the same files visible to
+the subagent returns the earlier answer instead of running the subagent again.
+Files the subagent wrote are stored with the answer and applied again on a hit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+from typing_extensions import TypedDict
+
+
+class CachedResult(TypedDict):
+    """A memoized subagent answer and the files it wrote."""
+
+    content: Any
+    files: dict[str, Any]
+
+
+def normalize_description(description: str) -> str:
+    """Collapse runs of whitespace and strip the ends."""
+    return " ".join(description.split())
+
+
+def result_cache_key(subagent_type: str, prompt: str, description: str, files_digest: str) -> str:
+    """Cache key for a `task` call.
+
+    The subagent's prompt is part of the key, so changing a subagent's
+    instructions never returns answers cached under the old ones.
+    """
+    digest = hashlib.sha256()
+    for part in (subagent_type, prompt, normalize_description(description), files_digest):
+        encoded = part.encode("utf-8", "surrogatepass")
+        digest.update(b"%d:" % len(encoded) + encoded)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Base class for subagent result caches.
+
+    Keeps at most `max_entries` results, evicting the least recently used, and
+    treats results older than `ttl` seconds (if set) as missing. Subclasses
+    implement `_load`, `_store`, `_delete` and `_evict`. `stats()` reports
+    hits and misses since the cache was created.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Return the cached result for `key`, or None (counting a hit or miss)."""
+        entry = self._load(key)
+        if entry is not None:
+            result, stored_at = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self._delete(key)
+                entry = None
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """Store a result, evicting the least recently used beyond `max_entries`."""
+        self._store(key, result, time.time())
+        self._evict(self.max_entries)
+
+    def stats(self) -> dict[str, Union[int, float]]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self),
+            }
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _load(self, key: str) -> Optional[tuple[CachedResult, float]]:
+        """Return (result, stored_at) and mark the entry as recently used."""
+        raise NotImplementedError
+
+    def _store(self, key: str, result: CachedResult, stored_at: float) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _evict(self, max_entries: int) -> None:
+        """Drop least recently used entries until at most `max_entries` remain."""
+        raise NotImplementedError
+
+
+class InMemoryResultCache(ResultCache):
+    """Keeps results in process memory. Share one instance across agents to share hits."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._entries: OrderedDict[str, tuple[CachedResult, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, result, stored_at):
+        with self._lock:
+            self._entries[key] = (result, stored_at)
+            self._entries.move_to_end(key)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self, max_entries):
+        with self._lock:
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResultCache(ResultCache):
+    """Keeps results in a SQLite table, so they survive restarts and can be
+    shared by processes. Results (and written files) must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+    ):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_results ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS task_results_used_at ON task_results (used_at)"
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM task_results").fetchone()[0]
+
+    def _load(self, key):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT result, stored_at FROM task_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE task_results SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0]), row[1]
+
+    def _store(self, key, result, stored_at):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_results (key, result, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), stored_at, stored_at),
+            )
+
+    def _delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM task_results WHERE key = ?", (key,))
+
+    def _evict(self, max_entries):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM task_results WHERE key NOT IN "
+                "(SELECT key FROM task_results ORDER BY used_at DESC LIMIT ?)",
+                (max_entries,),
+            )
@@ -0,0 +1,162 @@
+"""Routing each model call to a fast or a strong model.
+
+Many turns of a deep agent are routine: the next step after updating the todo
+list or listing files rarely needs the strongest model. `ModelRouter` stands
+in for the model of an agent and picks a tier per call from cheap signals
+(which tools just ran, how large the context is, which subagent is calling),
+optionally retrying on the strong model when the fast one fails.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Iterable, Literal, Optional, Union
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from deepagents.registry import ModelRegistry, default_model_registry
+
+Tier = Literal["fast", "strong"]
+
+# Tool results that the fast model can follow up on
+DEFAULT_FAST_TOOLS = frozenset(
+    {"write_todos", "ls", "read_file", "read_files", "glob", "grep", "write_file", "edit_file", "multi_edit"}
+)
+
+
+class ModelRouter(Runnable):
+    """Use as the `model` of `create_deep_agent` to pick a model per call.
+
+    Calls go to `fast` when every tool result since the last AI message comes
+    from one of `fast_tools` and the conversation is under `max_fast_tokens`
+    (approximately); all other calls (the user's request, results of other
+    tools, long contexts) go to `strong`. Subagents without their own model
+    use the router too, and `subagent_tiers` can pin a subagent type to a
+    tier. Pass `route` to replace these rules with your own function of the
+    messages and config.
+
+    With `escalate` on, a call on the fast model that raises or returns
+    malformed tool calls is retried on the strong model.
+
+    `stats()` reports calls, latency, tokens, errors and escalations per tier.
+    """
+
+    def __init__(
+        self,
+        fast: Union[str, dict[str, Any], Runnable],
+        strong: Union[str, dict[str, Any], Runnable],
+        fast_tools: Iterable[str] = DEFAULT_FAST_TOOLS,
+        max_fast_tokens: int = 32_000,
+        subagent_tiers: Optional[dict[str, Tier]] = None,
+        route: Optional[Callable[[list[BaseMessage], RunnableConfig], Tier]] = None,
+        escalate: bool = True,
+        model_registry: Optional[ModelRegistry] = None,
+    ):
+        registry = model_registry or default_model_registry
+        self.tiers: dict[str, Any] = {
+            "fast": fast if isinstance(fast, Runnable) else registry.get(fast),
+            "strong": strong if isinstance(strong, Runnable) else registry.get(strong),
+        }
+        self.fast_tools = frozenset(fast_tools)
+        self.max_fast_tokens = max_fast_tokens
+        self.subagent_tiers = subagent_tiers or {}
+        self.route = route or self.default_route
+        self.escalate = escalate
+        self._stats = {
+            tier: {"calls": 0, "errors": 0, "escalations": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0}
+            for tier in self.tiers
+        }
+        self._lock = threading.Lock()
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ModelRouter":
+        """Return a router whose models have `tools` bound. Stats are shared."""
+        bound = object.__new__(ModelRouter)
+        bound.__dict__.update(self.__dict__)
+        bound.tiers = {tier: model.bind_tools(tools, **kwargs) for tier, model in self.tiers.items()}
+        return bound
+
+    def default_route(self, messages: list[BaseMessage], config: RunnableConfig) -> Tier:
+        subagent_type = (config.get("metadata") or {}).get("subagent_type")
+        if subagent_type in self.subagent_tiers:
+            return self.subagent_tiers[subagent_type]
+        results = []
+        for message in reversed(messages):
+            if not isinstance(message, ToolMessage):
+                break
+            results.append(message)
+        if not results or any(m.name not in self.fast_tools for m in results):
+            return "strong"
+        if count_tokens_approximately(messages) > self.max_fast_tokens:
+            return "strong"
+        return "fast"
+
+    def _record(self, tier: str, start: Optional[float], message: Optional[BaseMessage] = None, **counts: int) -> None:
+        usage = getattr(message, "usage_metadata", None) or {}
+        with self._lock:
+            stats = self._stats[tier]
+            if start is not None:
+                stats["latency"] += time.perf_counter() - start
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+            for key, value in counts.items():
+                stats[key] += value
+
+    @staticmethod
+    def _failed(message: BaseMessage) -> bool:
+        return isinstance(message, AIMessage) and bool(message.invalid_tool_calls)
+
+    def _messages(self, input: Any) -> list[BaseMessage]:
+        if isinstance(input, PromptValue):
+            return input.to_messages()
+        return list(input)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        config = config or {}
+        tier = self.route(self._messages(input), config)
+        start = time.perf_counter()
+        try:
+            message = self.tiers[tier].invoke(input, config, **kwargs)
+        except Exception:
+            self._record(tier, start, calls=1, errors=1)
+            if tier == "strong" or not self.escalate:
+                raise
+        else:
+            if tier == "strong" or not self.escalate or not self._failed(message):
+                self._record(tier, start, message, calls=1)
+                return message
+            self._record(tier, start, message, calls=1, errors=1)
+        self._record(tier, None, escalations=1)
+        start = time.perf_counter()
+        message = self.tiers["strong"].invoke(input, config, **kwargs)
+        self._record("strong", start, message, calls=1)
+        return message
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        config = config or {}
+        tier = self.route(self._messages(input), config)
+        start = time.perf_counter()
+        try:
+            message = await self.tiers[tier].ainvoke(input, config, **kwargs)
+        except Exception:
+            self._record(tier, start, calls=1, errors=1)
+            if tier == "strong" or not self.escalate:
+                raise
+        else:
+            if tier == "strong" or not self.escalate or not self._failed(message):
+                self._record(tier, start, message, calls=1)
+                return message
+            self._record(tier, start, message, calls=1, errors=1)
+        self._record(tier, None, escalations=1)
+        start = time.perf_counter()
+        message = await self.tiers["strong"].ainvoke(input, config, **kwargs)
+        self._record("strong", start, message, calls=1)
+        return message
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                tier: {**stats, "avg_latency": stats["latency"] / stats["calls"] if stats["calls"] else None}
+                for tier, stats in self._stats.items()
+            }
@@ -0,0 +1,192 @@
+"""Concurrency limits, rate limits and queueing for `task` subagent calls."""
+
+import asyncio
+import itertools
+import threading
+import time
+from bisect import insort
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Literal, Optional, Union
+
+from langchain_core.rate_limiters import BaseRateLimiter, InMemoryRateLimiter
+
+
+class _Waiter:
+    __slots__ = ("subagent_type", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, subagent_type: str, loop: asyncio.AbstractEventLoop):
+        self.subagent_type = subagent_type
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+        self.cancelled = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class TaskScheduler:
+    """Decides when each `task` subagent call may start.
+
+    Calls wait in a queue until both the global limit (`max_concurrency`) and
+    the limit for their subagent type (`max_concurrency_per_subagent`, either
+    one number for every type or a dict by type name) have room, and then, if
+    the subagent's model has an entry in `rate_limits`, until that model's
+    token bucket has a token.
+
+    With `queue="fifo"` calls start in the order they were made. With
+    `queue="priority"` calls for subagent types with a higher value in
+    `priorities` go first, in order of arrival within the same priority. In
+    both modes a call whose own subagent type is at its limit does not hold
+    up calls of other types behind it.
+
+    `rate_limits` maps a model name to a langchain `BaseRateLimiter` or to a
+    number of requests per second (a token bucket with a burst of that many
+    requests). The same limiter object can also be passed to the chat model
+    itself as `rate_limiter=` to throttle every model request.
+
+    A single scheduler can be shared by several agents to apply the limits
+    across all of them.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_concurrency_per_subagent: Optional[Union[int, dict[str, int]]] = None,
+        rate_limits: Optional[dict[str, Union[float, BaseRateLimiter]]] = None,
+        queue: Literal["fifo", "priority"] = "fifo",
+        priorities: Optional[dict[str, int]] = None,
+        on_queue_wait: Optional[Callable[[str, float], None]] = None,
+    ):
+        if queue not in ("fifo", "priority"):
+            raise ValueError(f"queue must be 'fifo' or 'priority', got {queue!r}")
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_subagent = max_concurrency_per_subagent
+        self.queue = queue
+        self.priorities = priorities or {}
+        self.on_queue_wait = on_queue_wait
+        self.rate_limits: dict[str, BaseRateLimiter] = {}
+        for model_name, limit in (rate_limits or {}).items():
+            if not isinstance(limit, BaseRateLimiter):
+                limit = InMemoryRateLimiter(
+                    requests_per_second=limit,
+                    check_every_n_seconds=min(0.1, 1 / limit),
+                    max_bucket_size=max(limit, 1),
+                )
+            self.rate_limits[model_name] = limit
+        self._lock = threading.Lock()
+        self._waiting: list[tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._running_total = 0
+        self._running: dict[str, int] = {}
+        self._stats: dict[str, dict[str, float]] = {}
+
+    def _limit(self, subagent_type: str) -> Optional[int]:
+        limit = self.max_concurrency_per_subagent
+        if isinstance(limit, dict):
+            return limit.get(subagent_type)
+        return limit
+
+    def _has_room(self, subagent_type: str) -> bool:
+        if self.max_concurrency is not None and self._running_total >= self.max_concurrency:
+            return False
+        limit = self._limit(subagent_type)
+        return limit is None or self._running.get(subagent_type, 0) < limit
+
+    def _start(self, subagent_type: str) -> None:
+        self._running_total += 1
+        self._running[subagent_type] = self._running.get(subagent_type, 0) + 1
+
+    def _dispatch(self) -> None:
+        # Called with the lock held: start every waiter that now has room,
+        # walking the queue in order.
+        remaining = []
+        for entry in self._waiting:
+            waiter = entry[2]
+            if waiter.cancelled:
+                continue
+            if self._has_room(waiter.subagent_type):
+                self._start(waiter.subagent_type)
+                waiter.granted = True
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            else:
+                remaining.append(entry)
+        self._waiting = remaining
+
+    def _release(self, subagent_type: str, completed: bool = True) -> None:
+        with self._lock:
+            self._running_total -= 1
+            self._running[subagent_type] -= 1
+            if completed:
+                self._stats[subagent_type]["completed"] += 1
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, subagent_type: str, model_name: Optional[str] = None) -> AsyncIterator[float]:
+        """Wait for a turn to run a `subagent_type` subagent, and hold it.
+
+        Yields the time in seconds the call spent waiting.
+        """
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.monotonic()
+        waiter = None
+        with self._lock:
+            stats = self._stats.setdefault(
+                subagent_type,
+                {"submitted": 0, "started": 0, "completed": 0, "total_wait": 0.0, "max_wait": 0.0},
+            )
+            stats["submitted"] += 1
+            if not self._waiting and self._has_room(subagent_type):
+                self._start(subagent_type)
+            else:
+                waiter = _Waiter(subagent_type, loop)
+                priority = -self.priorities.get(subagent_type, 0) if self.queue == "priority" else 0
+                insort(self._waiting, (priority, next(self._seq), waiter), key=lambda e: e[:2])
+                self._dispatch()
+        try:
+            if waiter is not None:
+                await waiter.future
+            limiter = self.rate_limits.get(model_name) if model_name else None
+            if limiter is not None:
+                await limiter.aacquire()
+        except BaseException:
+            # Cancelled while waiting: give up the place in the queue, or the
+            # slot if it was already handed to us.
+            with self._lock:
+                holds_slot = waiter is None or waiter.granted
+                if not holds_slot:
+                    waiter.cancelled = True
+                    self._dispatch()
+            if holds_slot:
+                self._release(subagent_type, completed=False)
+            raise
+        wait = time.monotonic() - enqueued_at
+        with self._lock:
+            stats["started"] += 1
+            stats["total_wait"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+        if self.on_queue_wait is not None:
+            self.on_queue_wait(subagent_type, wait)
+        try:
+            yield wait
+        finally:
+            self._release(subagent_type)
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """Queue and run counts plus queue-wait times (seconds) per subagent type."""
+        with self._lock:
+            queued: dict[str, int] = {}
+            for _, _, waiter in self._waiting:
+                if not waiter.cancelled:
+                    queued[waiter.subagent_type] = queued.get(waiter.subagent_type, 0) + 1
+            result = {}
+            for subagent_type, stats in self._stats.items():
+                result[subagent_type] = {
+                    **stats,
+                    "queued": queued.get(subagent_type, 0),
+                    "running": self._running.get(subagent_type, 0),
+                    "avg_wait": stats["total_wait"] / stats["started"] if stats["started"] else 0.0,
+                }
+            return result
@@ -0,0 +1,187 @@
+"""Trigram index used by the `grep` and `glob` tools."""
+
+import re
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+# Characters that end a run of literal characters in a regex
+_REGEX_SPECIAL = set(".^$*+?{}[]()|")
+# Quantifiers that make the character before them optional
+_OPTIONAL_QUANTIFIERS = set("*?{")
+# A backslash escape and everything it spans: numeric and named character
+# escapes, octal escapes and group references, or a single character
+_ESCAPE = re.compile(
+    r"\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}"
+    r"|0[0-7]{0,2}|[0-7]{3}|[1-9][0-9]?|.)",
+    re.DOTALL,
+)
+
+
+def _trigrams(text: str) -> set[str]:
+    # Case-folded, so one index serves case-sensitive and insensitive searches
+    text = text.casefold()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Return literal substrings that every match of `pattern` must contain.
+
+    This is deliberately conservative: patterns with alternation yield no
+    literals (so every file is a candidate), and anything inside groups,
+    classes or optional quantifiers is ignored.
+    """
+    if "|" in pattern or re.compile(pattern).flags & re.VERBOSE:
+        return []
+    literals, current = [], []
+    depth = 0
+    i = 0
+
+    def flush():
+        literals.append("".join(current))
+        current.clear()
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escape = _ESCAPE.match(pattern, i).group()
+            i += len(escape)
+            if depth or escape[1].isalnum():
+                # Inside a group, or a special escape such as \d, \n or \x41
+                flush()
+            else:
+                current.append(escape[1])
+            continue
+        if char == "[":
+            # Skip the whole character class
+            end = i + 1
+            if end < len(pattern) and pattern[end] == "^":
+                end += 1
+            if end < len(pattern) and pattern[end] == "]":
+                end += 1
+            while end < len(pattern) and pattern[end] != "]":
+                end += 2 if pattern[end] == "\\" else 1
+            i = end + 1
+            flush()
+            continue
+        if char in _OPTIONAL_QUANTIFIERS and current:
+            current.pop()
+        if char == "{":
+            end = pattern.find("}", i)
+            i = end + 1 if end != -1 else len(pattern)
+            flush()
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        if depth or char in _REGEX_SPECIAL:
+            flush()
+        else:
+            current.append(char)
+        i += 1
+    flush()
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def compile_glob(pattern: str) -> re.Pattern:
+    """Compile a path glob. `*` and `?` stay within one path segment, `**` spans any."""
+    pattern = pattern.lstrip("/")
+    i, parts = 0, []
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif char == "?":
+            parts.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+                i += 1
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end + 1
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    return re.compile("/?" + "".join(parts) + r"\Z")
+
+
+class SearchIndex:
+    """Inverted trigram index over versions of files.
+
+    Entries are keyed by path and version token (any value that changes when
+    the file changes), so one index can serve different views of the same
+    files, such as a parent agent and subagents with their own copies: each
+    `search` indexes the versions in its view that are not indexed yet and
+    answers from that view only. Versions outside the view are kept (another
+    view may still use them) until there are more than `max_stale` of them.
+    """
+
+    def __init__(self, max_stale: int = 1024):
+        self.max_stale = max_stale
+        self._trigrams: dict[tuple[str, Any], set[str]] = {}
+        self._postings: dict[str, set[tuple[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def search(
+        self,
+        versions: dict[str, Any],
+        load: Callable[[str], Optional[str]],
+        literals: Iterable[str],
+    ) -> list[str]:
+        """Return the paths that may contain all of `literals`, sorted.
+
+        `versions` maps each path in the view to its version token. Updating the index and querying it happen under one lock, so a
+        concurrent search of another view can't change the index in between.
+        """
+        with self._lock:
+            view: dict[tuple[str, Any], str] = {}
+            for path, version in versions.items():
+                key = (path, version)
+                if key not in self._trigrams:
+                    content = load(path)
+                    if content is None:
+                        continue
+                    self._add(key, content)
+                view[key] = path
+            if len(self._trigrams) > len(view) + self.max_stale:
+                for key in [k for k in self._trigrams if k not in view]:
+                    self._remove(key)
+
+            result = None
+            for literal in literals:
+                for trigram in _trigrams(literal):
+                    keys = self._postings.get(trigram, set())
+                    result = keys & view.keys() if result is None else result & keys
+                    if not result:
+                        return []
+            return sorted(view[key] for key in (view if result is None else result))
+
+    def _add(self, key: tuple[str, Any], content: str) -> None:
+        trigrams = self._trigrams[key] = _trigrams(content)
+        for trigram in trigrams:
+            self._postings.setdefault(trigram, set()).add(key)
+
+    def _remove(self, key: tuple[str, Any]) -> None:
+        for trigram in self._trigrams.pop(key, ()):
+            keys = self._postings.get(trigram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[trigram]
+
+    def __len__(self) -> int:
+        """Number of indexed file versions."""
+        return len(self._trigrams)
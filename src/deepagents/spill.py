@@ -0,0 +1,125 @@
+"""Moving oversized tool outputs out of the conversation and into files."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.types import Command
+
+from deepagents.backends import FileBackend, StateBackend
+from deepagents.compaction import tool_result_path
+from deepagents.sub_agent import _as_tool
+
+SPILLED_TOOL_RESULT = (
+    "{preview}\n\n[Output truncated: the full result ({size} characters) was saved to "
+    "the file '{path}'. Use read_file (with offset and limit) or grep to see the rest.]"
+)
+
+
+class SpillingTool(BaseTool):
+    """Wraps a tool so that results over `max_chars` characters go into a file.
+
+    The wrapped tool runs unchanged (it keeps its name, description, metadata
+    and args schema, so injected arguments still work). If the `ToolMessage`
+    it returns is longer than `max_chars`, the full text is written to
+    `tool_results/<tool_call_id>.txt` through `backend`, and the model gets the
+    first `preview_chars` characters plus the file's path instead.
+    """
+
+    tool: BaseTool
+    max_chars: int
+    preview_chars: int = 2000
+    backend: FileBackend
+
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        super().__init__(
+            tool=tool,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            metadata=tool.metadata,
+            **kwargs,
+        )
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        return self.tool._run(*args, **kwargs)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self._spill(self.tool.invoke(input, config, **kwargs), config)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self._spill(await self.tool.ainvoke(input, config, **kwargs), config)
+
+    def _spill(self, output: Any, config: Optional[RunnableConfig]) -> Any:
+        # Only tool calls made by the agent produce a ToolMessage; plain
+        # invocations and Commands are passed through
+        if (
+            not isinstance(output, ToolMessage)
+            or not isinstance(output.content, str)
+            or len(output.content) <= self.max_chars
+        ):
+            return output
+        path = tool_result_path(output.tool_call_id)
+        delta = self.backend.write(path, output.content, {}, config or {})
+        message = ToolMessage(
+            SPILLED_TOOL_RESULT.format(
+                preview=output.content[: self.preview_chars],
+                size=len(output.content),
+                path=path,
+            ),
+            tool_call_id=output.tool_call_id,
+            name=output.name,
+            status=output.status,
+            artifact=output.artifact,
+            # Lets compaction point at this file instead of saving the preview over it
+            response_metadata={"spilled": {"path": path, "size": len(output.content)}},
+        )
+        if not delta:
+            # The backend keeps files outside of graph state
+            return message
+        return Command(update={"files": delta, "messages": [message]})
+
+
+# Wrappers are reused, so the same tools give the same (cacheable) subagent
+# graphs. Each entry holds its tool and backend, so their ids in the key can't
+# be reused while it is cached.
+_WRAPPER_CACHE_SIZE = 1024
+_wrappers: OrderedDict[tuple, SpillingTool] = OrderedDict()
+_wrappers_lock = threading.Lock()
+_default_backend = StateBackend()
+
+
+def spill_large_outputs(
+    tools: list[Any],
+    max_chars: int,
+    preview_chars: int = 2000,
+    backend: Optional[FileBackend] = None,
+) -> list[Any]:
+    """Wrap each tool in `tools` with a `SpillingTool`.
+
+    Plain functions are converted to tools first; anything that is not a tool
+    (such as a provider tool spec dict) is returned unchanged.
+    """
+    backend = backend or _default_backend
+    wrapped = []
+    for tool_ in tools:
+        if isinstance(tool_, dict):
+            wrapped.append(tool_)
+            continue
+        tool_ = _as_tool(tool_)
+        key = (id(tool_), max_chars, preview_chars, id(backend))
+        with _wrappers_lock:
+            spilling = _wrappers.get(key)
+            if spilling is None:
+                spilling = _wrappers[key] = SpillingTool(
+                    tool_, max_chars=max_chars, preview_chars=preview_chars, backend=backend
+                )
+                while len(_wrappers) > _WRAPPER_CACHE_SIZE:
+                    _wrappers.popitem(last=False)
+            _wrappers.move_to_end(key)
+        wrapped.append(spilling)
+    return wrapped
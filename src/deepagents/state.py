@@ -1,8 +1,11 @@
 from langgraph.prebuilt.chat_agent_executor import AgentState
-from typing import NotRequired, Annotated
+from typing import NotRequired, Annotated, Union
 from typing import Literal
 from typing_extensions import TypedDict
 
+from deepagents.files import FileMap, FileOverlay
+from deepagents.blobs import BlobRef
+
 
 class Todo(TypedDict):
     """Todo to track."""
@@ -12,14 +15,28 @@ class Todo(TypedDict):
 
 
 def file_reducer(l, r):
-    if l is None:
-        return r
-    elif r is None:
+    """Merge a files delta into the current files.
+
+    `r` maps paths to their new contents, with `None` marking a deleted path.
+    The result is always a new `FileMap`; `l` is never mutated, because the
+    previous value may still be referenced by a checkpoint being written or a
+    streamed snapshot. Only references to the contents are copied, never the
+    contents themselves. The exception is a `FileOverlay` given as a
+    subagent's input, which is made for that subagent and is used as-is.
+    """
+    if r is None:
         return l
-    else:
-        return {**l, **r}
+    if not l and isinstance(r, FileOverlay):
+        return r
+    if isinstance(l, FileMap):
+        return l.updated(r)
+    files = FileMap()
+    files.apply(l or {})
+    files.apply(r)
+    return files
 
 
 class DeepAgentState(AgentState):
     todos: NotRequired[list[Todo]]
-    files: Annotated[NotRequired[dict[str, str]], file_reducer]
+    # Values are file contents, or references when a BlobStore is configured
+    files: Annotated[NotRequired[dict[str, Union[str, BlobRef]]], file_reducer]
@@ -1,15 +1,30 @@
 from deepagents.prompts import TASK_DESCRIPTION_PREFIX, TASK_DESCRIPTION_SUFFIX
 from deepagents.state import DeepAgentState
+from deepagents.files import FileOverlay
+from deepagents.search import compile_glob
+from deepagents.caching import cached_system_prompt, supports_prompt_caching
+from deepagents.scheduler import TaskScheduler
+from deepagents.result_cache import ResultCache, result_cache_key
+from deepagents.backends import FileBackend, StateBackend
+from deepagents.instrumentation import TASK_EVENT
+from deepagents.instructions import ConfigurablePrompt
+from deepagents.registry import ModelRegistry, default_model_registry
+from deepagents.tool_execution import ToolExecution, _react_agent_tools, writes_files
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import BaseTool
+from langchain_core.callbacks.manager import adispatch_custom_event
 from typing_extensions import TypedDict
 from langchain_core.tools import tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.language_models import LanguageModelLike
-from langchain.chat_models import init_chat_model
-from typing import Annotated, NotRequired, Any, Union
+from typing import Annotated, NotRequired, Any, Union, Optional, Callable
 from langgraph.types import Command
+from langgraph.config import get_stream_writer
+from collections import OrderedDict
 import asyncio
+import json
+import threading
 
 from langgraph.prebuilt import InjectedState
 
@@ -21,37 +36,180 @@ class SubAgent(TypedDict):
     tools: NotRequired[list[str]]
     # Optional per-subagent model: can be either a model instance OR dict settings
     model: NotRequired[Union[LanguageModelLike, dict[str, Any]]]
+    # Optional glob patterns of the files in state the subagent can see.
+    # Defaults to all files.
+    files: NotRequired[list[str]]
 
 
-def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, state_schema):
+def _model_name(model) -> Optional[str]:
+    if isinstance(model, str):
+        return model
+    if isinstance(model, dict):
+        return model.get("model")
+    return getattr(model, "model_name", None) or getattr(model, "model", None)
+
+
+# Compiled subagent graphs, shared by every agent that has a subagent with the
+# same prompt, tools, model and state schema.
+_GRAPH_CACHE_SIZE = 128
+_graph_cache: OrderedDict[tuple, tuple[Any, tuple]] = OrderedDict()
+# id(function) -> (function, tool); the entry keeps the function alive, so
+# its id can't be reused while cached
+_wrapped_tools: OrderedDict[int, tuple[Callable, BaseTool]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _as_tool(tool_) -> BaseTool:
+    """Wrap a plain function as a tool, reusing the wrapper made last time."""
+    if isinstance(tool_, BaseTool):
+        return tool_
+    with _cache_lock:
+        entry = _wrapped_tools.get(id(tool_))
+        if entry is not None:
+            _wrapped_tools.move_to_end(id(tool_))
+            return entry[1]
+    wrapped = tool(tool_)
+    with _cache_lock:
+        _wrapped_tools[id(tool_)] = (tool_, wrapped)
+        while len(_wrapped_tools) > _GRAPH_CACHE_SIZE:
+            _wrapped_tools.popitem(last=False)
+    return wrapped
+
+
+def _model_key(model) -> tuple:
+    if isinstance(model, str):
+        return ("name", model)
+    if isinstance(model, dict):
+        return ("config", json.dumps(model, sort_keys=True, default=repr))
+    return ("instance", id(model))
+
+
+def _get_subagent_graph(
+    model, prompt, tools, state_schema, prompt_caching=None, registry=None, tool_execution="parallel"
+):
+    """Return the compiled graph for a subagent, compiling it on first use.
+
+    `model` is a model instance or `init_chat_model` settings, which are
+    resolved through `registry` (default: `default_model_registry`). Tools,
+    model instances and registries are keyed by identity; the cache keeps a
+    reference to them, so an id in a key can't be reused by another object
+    while the entry lives. `prompt_caching` None means on for Anthropic models
+    only. `tool_execution` is as for `create_deep_agent`.
+    """
+    registry = registry or default_model_registry
+    key = (
+        prompt,
+        tuple(id(t) for t in tools),
+        _model_key(model),
+        state_schema,
+        prompt_caching,
+        id(registry),
+        tool_execution,
+    )
+    with _cache_lock:
+        entry = _graph_cache.get(key)
+        if entry is not None:
+            _graph_cache.move_to_end(key)
+            return entry[0]
+        if isinstance(model, dict):
+            # Dictionary settings - one shared model per distinct settings
+            sub_model = registry.get(model)
+        else:
+            sub_model = model
+        if prompt_caching or (prompt_caching is None and supports_prompt_caching(sub_model)):
+            if isinstance(prompt, ConfigurablePrompt):
+                prompt = prompt.cached()
+            else:
+                prompt = cached_system_prompt(prompt)
+        graph = create_react_agent(
+            sub_model,
+            prompt=prompt,
+            state_schema=state_schema,
+            checkpointer=False,
+            **_react_agent_tools(tools, tool_execution),
+        )
+        _graph_cache[key] = (graph, (tuple(tools), model, registry))
+        while len(_graph_cache) > _GRAPH_CACHE_SIZE:
+            _graph_cache.popitem(last=False)
+        return graph
+
+
+async def _run_subagent(sub_agent, sub_state, sub_config, config: RunnableConfig):
+    """Run a subagent, bracketed by "custom" stream events for the parent's stream.
+
+    Subagent events are streamed under the parent's `tools:<task id>`
+    namespace; the start and end events carry that namespace along with the
+    subagent type and tool call id.
+    """
+    writer = get_stream_writer()
+    event = {
+        **sub_config["metadata"],
+        "namespace": config.get("configurable", {}).get("checkpoint_ns", ""),
+    }
+    writer({**event, "event": "subagent_start"})
+    try:
+        result = await sub_agent.ainvoke(sub_state, sub_config)
+    except BaseException:
+        writer({**event, "event": "subagent_end", "status": "error"})
+        raise
+    writer({**event, "event": "subagent_end", "status": "success"})
+    return result
+
+
+def _task_result(content, files: dict[str, Any], tool_call_id: str) -> Command:
+    # Parallel task calls each return their own delta; the graph applies them
+    # in tool-call order, so a later call's write to the same path wins.
+    update = {"messages": [ToolMessage(content, tool_call_id=tool_call_id)]}
+    if files:
+        update["files"] = files
+    return Command(update=update)
+
+
+def _create_task_tool(
+    tools,
+    instructions,
+    subagents: list[SubAgent],
+    model,
+    state_schema,
+    scheduler: Optional[TaskScheduler] = None,
+    result_cache: Optional[ResultCache] = None,
+    backend: Optional[FileBackend] = None,
+    prompt_caching: Optional[bool] = None,
+    instrumented: bool = False,
+    model_registry: Optional[ModelRegistry] = None,
+    tool_execution: ToolExecution = "parallel",
+):
+    backend = backend or StateBackend()
+    # (model, prompt, tools, state_schema, prompt_caching, model_registry,
+    # tool_execution) per subagent type.
+    # Graphs are compiled by `_get_subagent_graph` the first time a type is called.
     agents = {
-        "general-purpose": create_react_agent(model, prompt=instructions, tools=tools, checkpointer=False)
+        "general-purpose": (
+            model, instructions, tuple(tools), state_schema, prompt_caching, model_registry, tool_execution
+        )
     }
+    model_names = {"general-purpose": _model_name(model)}
+    # Compiled globs of the files each subagent type can see (None: all files)
+    file_scopes = {"general-purpose": None}
     tools_by_name = {}
     for tool_ in tools:
-        if not isinstance(tool_, BaseTool):
-            tool_ = tool(tool_)
+        tool_ = _as_tool(tool_)
         tools_by_name[tool_.name] = tool_
     for _agent in subagents:
         if "tools" in _agent:
-            _tools = [tools_by_name[t] for t in _agent["tools"]]
-        else:
-            _tools = tools
-        # Resolve per-subagent model: can be instance or dict
-        if "model" in _agent:
-            agent_model = _agent["model"]
-            if isinstance(agent_model, dict):
-                # Dictionary settings - create model from config
-                sub_model = init_chat_model(**agent_model)
-            else:
-                # Model instance - use directly
-                sub_model = agent_model
+            _tools = tuple(tools_by_name[t] for t in _agent["tools"])
         else:
-            # Fallback to main model
-            sub_model = model
-        agents[_agent["name"]] = create_react_agent(
-            sub_model, prompt=_agent["prompt"], tools=_tools, state_schema=state_schema, checkpointer=False
+            _tools = tuple(tools)
+        # Per-subagent model: instance or dict settings, else the main model
+        agent_model = _agent.get("model", model)
+        model_names[_agent["name"]] = _model_name(agent_model)
+        agents[_agent["name"]] = (
+            agent_model, _agent["prompt"], _tools, state_schema, prompt_caching, model_registry, tool_execution
         )
+        if "files" in _agent:
+            file_scopes[_agent["name"]] = [compile_glob(p) for p in _agent["files"]]
+        else:
+            file_scopes[_agent["name"]] = None
 
     other_agents_string = [
         f"- {_agent['name']}: {_agent['description']}" for _agent in subagents
@@ -66,33 +224,73 @@ def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, sta
         subagent_type: str,
         state: Annotated[DeepAgentState, InjectedState],
         tool_call_id: Annotated[str, InjectedToolCallId],
+        config: RunnableConfig,
     ):
         if subagent_type not in agents:
             return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
 
-        sub_agent = agents[subagent_type]
-        state["messages"] = [{"role": "user", "content": description}]
+        # Hand over only the files in scope, as a copy-on-write overlay. The
+        # parent's files are never modified by the subagent; what it writes
+        # comes back as a delta.
+        files = state.get("files", {})
+        scope = file_scopes[subagent_type]
+        if scope is not None:
+            overlay = FileOverlay(files, [p for p in files if any(r.match(p) for r in scope)])
+        else:
+            overlay = FileOverlay(files)
+        sub_state = {**state, "messages": [{"role": "user", "content": description}], "files": overlay}
+
+        async def report(**data):
+            # Tells Instrumentation how long this call queued and whether it was cached
+            if instrumented:
+                await adispatch_custom_event(TASK_EVENT, {**data, "files": len(overlay)}, config=config)
+
+        cache_key = None
+        if result_cache is not None:
+            prompt = agents[subagent_type][1]
+            if isinstance(prompt, ConfigurablePrompt):
+                prompt = prompt.text(config)
+            cache_key = result_cache_key(
+                subagent_type, prompt, description, backend.files_digest(sub_state, config)
+            )
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                await report(queue_wait=0.0, cached=True)
+                return _task_result(cached["content"], cached["files"], tool_call_id)
 
         # Use the asynchronous ainvoke method for StructuredTool compatibility
         try:
-            result = await sub_agent.ainvoke(state)
+            sub_agent = _get_subagent_graph(*agents[subagent_type])
+            # Tag the subagent run, so its events in a parent `astream(...,
+            # subgraphs=True)` (and in callbacks) can be told apart
+            sub_config = {
+                "run_name": subagent_type,
+                "tags": [f"subagent:{subagent_type}"],
+                "metadata": {"subagent_type": subagent_type, "tool_call_id": tool_call_id},
+            }
+            if scheduler is not None:
+                async with scheduler.slot(subagent_type, model_names[subagent_type]) as queue_wait:
+                    await report(queue_wait=queue_wait, cached=False)
+                    result = await _run_subagent(sub_agent, sub_state, sub_config, config)
+            else:
+                await report(queue_wait=0.0, cached=False)
+                result = await _run_subagent(sub_agent, sub_state, sub_config, config)
 
             # Extract the response content
             if result and "messages" in result and result["messages"]:
                 response_content = result["messages"][-1].content
 
-                # Update the state with files if any were created
-                if "files" in result:
-                    # Update the current state with new files
-                    current_files = state.get("files", {})
-                    current_files.update(result["files"])
-                    state["files"] = current_files
-
-                return response_content
+                # Only the files the subagent wrote or deleted go back
+                written = overlay.changes(result.get("files", overlay))
+                if cache_key is not None:
+                    result_cache.put(cache_key, {"content": response_content, "files": written})
+                return _task_result(response_content, written, tool_call_id)
             else:
                 return "Subagent completed but returned no response."
 
         except Exception as e:
             return f"Error executing subagent: {str(e)}"
 
-    return task
+    # Subagents write to their own copy of the files and hand back only what
+    # they changed, so their calls can run alongside each other
+    return writes_files(task)
@@ -0,0 +1,222 @@
+"""Running the tool calls of one AI message without conflicting writes.
+
+By default every tool call in an AI message runs at once, against the state
+from before the message. Two `edit_file` calls on the same file then both edit
+the old contents, and the update applied last silently drops the other edit.
+`IsolatedToolNode` runs such calls one after another instead, using tool
+metadata to tell read-only tools from tools that write files.
+"""
+
+from typing import Any, Callable, Iterable, Literal, Optional, Sequence, Union
+
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, tool
+from langgraph.prebuilt import ToolNode
+from langgraph.types import Command
+
+from deepagents.files import FileOverlay
+
+# Tool metadata keys. A tool with `{"read_only": True}` has no side effects;
+# `{"writes": ["file_path"]}` names the arguments holding the paths a tool
+# writes ("edits.file_path" takes "file_path" from each item of "edits"), and
+# `{"writes": []}` marks a tool that changes state but writes no files.
+READ_ONLY_KEY = "read_only"
+WRITES_KEY = "writes"
+
+# "parallel": every tool call of a message at once (the `ToolNode` default);
+# "isolated": conflicting calls one after another (see `IsolatedToolNode`)
+ToolExecution = Literal["parallel", "isolated"]
+
+
+def read_only(tool_: Union[BaseTool, Callable]) -> BaseTool:
+    """Mark `tool_` as free of side effects, so its calls run alongside others.
+
+    A plain function is made into a tool first; use the tool returned.
+    """
+    tool_ = tool_ if isinstance(tool_, BaseTool) else tool(tool_)
+    tool_.metadata = {**(tool_.metadata or {}), READ_ONLY_KEY: True}
+    return tool_
+
+
+def writes_files(tool_: Union[BaseTool, Callable], *path_args: str) -> BaseTool:
+    """Mark `tool_` as writing the files whose paths are in `path_args`.
+
+    A plain function is made into a tool first; use the tool returned.
+    """
+    tool_ = tool_ if isinstance(tool_, BaseTool) else tool(tool_)
+    tool_.metadata = {**(tool_.metadata or {}), WRITES_KEY: list(path_args)}
+    return tool_
+
+
+def _values(args: Any, path_arg: str) -> Iterable[Any]:
+    name, _, rest = path_arg.partition(".")
+    value = args.get(name) if isinstance(args, dict) else None
+    if value is None:
+        return []
+    if not rest:
+        return [value]
+    items = value if isinstance(value, list) else [value]
+    return [v for item in items for v in _values(item, rest)]
+
+
+class IsolatedToolNode(ToolNode):
+    """A `ToolNode` that serializes the tool calls that could conflict.
+
+    The calls of one AI message run in rounds, each a regular (concurrent)
+    `ToolNode` run:
+
+    - calls to read-only tools, and the first write to each path, run in the
+      first round;
+    - each further write to a path runs in the round after the previous write
+      to it, seeing the files as that write left them;
+    - calls to tools that are neither read-only nor declare the paths they
+      write run last, one at a time, in the order they were made.
+
+    Results come back in the order of the tool calls, so the files end up as
+    if the writes had run in that order. When nothing conflicts, every call
+    runs as it would in a `ToolNode`.
+
+    The agent sends each tool call to the tools node separately; when rounds
+    are needed, the node run for the first pending call runs them all and the
+    others return no updates.
+    """
+
+    def _rounds(self, calls: list[ToolCall]) -> Optional[list[list[ToolCall]]]:
+        rounds: list[list[ToolCall]] = [[]]
+        unclassified = []
+        writes: dict[str, int] = {}
+        for call in calls:
+            tool_ = self.tools_by_name.get(call["name"])
+            metadata = (tool_.metadata if tool_ is not None else None) or {}
+            if tool_ is None or metadata.get(READ_ONLY_KEY):
+                # Unknown tools only produce an error message
+                rounds[0].append(call)
+            elif WRITES_KEY in metadata:
+                paths = {
+                    str(p) for arg in metadata[WRITES_KEY] for p in _values(call["args"], arg)
+                }
+                # After the last write to any of its paths
+                position = max((writes.get(p, -1) + 1 for p in paths), default=0)
+                for path in paths:
+                    writes[path] = position
+                while len(rounds) <= position:
+                    rounds.append([])
+                rounds[position].append(call)
+            else:
+                unclassified.append(call)
+        rounds.extend([call] for call in unclassified)
+        rounds = [calls for calls in rounds if calls]
+        return rounds if len(rounds) > 1 else None
+
+    def _schedule(self, input: Any) -> Optional[tuple[dict[str, Any], list[ToolCall], list[list[ToolCall]]]]:
+        """Return the state, the pending tool calls and their rounds for `input`.
+
+        None means `input` runs as in a `ToolNode`; no rounds mean that the
+        node run for another call handles this one.
+        """
+        if isinstance(input, dict) and input.get("__type") == "tool_call_with_context":
+            # One call sent on its own, with the state it was made in
+            state, call_id = input["state"], input["tool_call"]["id"]
+        elif isinstance(input, dict) and input.get("messages"):
+            state, call_id = input, None
+        else:
+            return None
+        message = next((m for m in reversed(state["messages"]) if isinstance(m, AIMessage)), None)
+        if message is None:
+            return None
+        answered = {m.tool_call_id for m in state["messages"] if isinstance(m, ToolMessage)}
+        pending = [call for call in message.tool_calls if call["id"] not in answered]
+        if len(pending) < 2:
+            return None
+        rounds = self._rounds(pending)
+        if rounds is None:
+            return None
+        if call_id is not None and call_id != pending[0]["id"]:
+            return state, pending, []
+        return state, pending, rounds
+
+    @staticmethod
+    def _round_input(state: dict[str, Any], calls: list[ToolCall], files: Any) -> dict[str, Any]:
+        messages = list(state["messages"])
+        i = next(i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], AIMessage))
+        messages[i] = messages[i].model_copy(update={"tool_calls": calls})
+        return {**state, "messages": messages, "files": files}
+
+    @staticmethod
+    def _updates(output: Any) -> list[Union[Command, dict[str, Any]]]:
+        """Split a `ToolNode` output into one update per tool call."""
+        updates = []
+        for item in output if isinstance(output, list) else [output]:
+            if isinstance(item, dict):
+                updates.extend({**item, "messages": [m]} for m in item.get("messages", []))
+            else:
+                updates.append(item)
+        return updates
+
+    @staticmethod
+    def _tool_call_id(update: Union[Command, dict[str, Any]]) -> Optional[str]:
+        values = update.update if isinstance(update, Command) else update
+        if isinstance(values, dict):
+            for message in values.get("messages") or []:
+                if isinstance(message, ToolMessage):
+                    return message.tool_call_id
+        return None
+
+    @staticmethod
+    def _apply(files: FileOverlay, updates: list[Union[Command, dict[str, Any]]]) -> None:
+        for update in updates:
+            values = update.update if isinstance(update, Command) else update
+            if isinstance(values, dict) and values.get("files"):
+                files.apply(values["files"])
+
+    def _combine(self, calls: list[ToolCall], updates: list[Union[Command, dict[str, Any]]]) -> Any:
+        order = {call["id"]: i for i, call in enumerate(calls)}
+        updates = sorted(updates, key=lambda u: order.get(self._tool_call_id(u), len(order)))
+        if any(isinstance(u, Command) for u in updates):
+            return updates
+        # A node may only return a list of updates if it holds a Command
+        return {"messages": [m for u in updates for m in u.get("messages", [])]}
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        schedule = self._schedule(input)
+        if schedule is None:
+            return super().invoke(input, config, **kwargs)
+        state, pending, rounds = schedule
+        if not rounds:
+            return {}
+        files = FileOverlay(state.get("files") or {})
+        updates = []
+        for calls in rounds:
+            output = super().invoke(self._round_input(state, calls, files), config, **kwargs)
+            round_updates = self._updates(output)
+            self._apply(files, round_updates)
+            updates.extend(round_updates)
+        return self._combine(pending, updates)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        schedule = self._schedule(input)
+        if schedule is None:
+            return await super().ainvoke(input, config, **kwargs)
+        state, pending, rounds = schedule
+        if not rounds:
+            return {}
+        files = FileOverlay(state.get("files") or {})
+        updates = []
+        for calls in rounds:
+            output = await super().ainvoke(self._round_input(state, calls, files), config, **kwargs)
+            round_updates = self._updates(output)
+            self._apply(files, round_updates)
+            updates.extend(round_updates)
+        return self._combine(pending, updates)
+
+
+def _react_agent_tools(tools: Sequence[Any], tool_execution: ToolExecution) -> dict[str, Any]:
+    """The `create_react_agent` arguments that run `tools` as `tool_execution` says."""
+    if tool_execution == "parallel":
+        return {"tools": list(tools)}
+    if tool_execution != "isolated":
+        raise ValueError(f"Unknown tool_execution {tool_execution!r}; use 'parallel' or 'isolated'")
+    if any(isinstance(t, dict) for t in tools):
+        raise ValueError("tool_execution='isolated' does not support provider tool specs (dict tools)")
+    return {"tools": IsolatedToolNode(list(tools))}
@@ -1,15 +1,47 @@
+import functools
+import re
+import weakref
+
 from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
-from typing import Annotated
+from langchain_core.runnables import RunnableConfig
+from typing import Annotated, NotRequired, Optional, Union
 from langgraph.prebuilt import InjectedState
+from typing_extensions import TypedDict
 
 from deepagents.prompts import (
     WRITE_TODOS_DESCRIPTION,
     EDIT_DESCRIPTION,
     TOOL_DESCRIPTION,
+    GREP_DESCRIPTION,
+    GLOB_DESCRIPTION,
+    LS_DESCRIPTION,
+    READ_FILES_DESCRIPTION,
+    MULTI_EDIT_DESCRIPTION,
 )
 from deepagents.state import Todo, DeepAgentState
+from deepagents.files import FileContent
+from deepagents.backends import FileBackend, InvalidPathError, StateBackend
+from deepagents.search import compile_glob, required_literals
+from deepagents.tool_execution import read_only, writes_files
+
+
+class FileEdit(TypedDict):
+    """One exact string replacement for `multi_edit`."""
+
+    file_path: str
+    old_string: str
+    new_string: str
+    replace_all: NotRequired[bool]
+
+
+class FileReadRequest(TypedDict):
+    """A file (or window of lines in it) to read with `read_files`."""
+
+    file_path: str
+    offset: NotRequired[int]
+    limit: NotRequired[int]
 
 
 @tool(description=WRITE_TODOS_DESCRIPTION)
@@ -26,124 +58,392 @@ def write_todos(
     )
 
 
-@tool
-def ls(state: Annotated[DeepAgentState, InjectedState]) -> list[str]:
-    """List all files"""
-    return list(state.get("files", {}).keys())
+# Writes the todo list but no files, so it never conflicts with file tools
+writes_files(write_todos)
 
 
-@tool(description=TOOL_DESCRIPTION)
-def read_file(
-    file_path: str,
-    state: Annotated[DeepAgentState, InjectedState],
-    offset: int = 0,
-    limit: int = 2000,
-) -> str:
-    """Read file."""
-    mock_filesystem = state.get("files", {})
-    if file_path not in mock_filesystem:
-        return f"Error: File '{file_path}' not found"
+def _replace(
+    content: FileContent, old_string: str, new_string: str, replace_all: bool
+) -> Union[str, tuple[FileContent, int]]:
+    """Replace `old_string` in `content`.
 
-    # Get file content
-    content = mock_filesystem[file_path]
+    Returns the new contents and the number of replacements, or an error
+    message. Occurrences are only counted when they are needed.
+    """
+    start = content.find(old_string)
+    if start == -1:
+        return f"Error: String not found in file: '{old_string}'"
+    if replace_all:
+        return FileContent(content.replace(old_string, new_string)), content.count(old_string)
+    # Unique if there is no second (non-overlapping) occurrence
+    if content.find(old_string, start + max(len(old_string), 1)) != -1:
+        occurrences = content.count(old_string)
+        return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
+    # Replace only this occurrence, reindexing just the lines it touches
+    return content.splice(start, start + len(old_string), new_string), 1
 
-    # Handle empty file
-    if not content or content.strip() == "":
-        return "System reminder: File exists but has empty contents"
 
-    # Split content into lines
-    lines = content.splitlines()
+def _path_errors(func):
+    """Return a backend's `InvalidPathError` to the model instead of raising it."""
 
-    # Apply line offset and limit
-    start_idx = offset
-    end_idx = min(start_idx + limit, len(lines))
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except InvalidPathError as e:
+            return f"Error: {e}"
 
-    # Handle case where offset is beyond file length
-    if start_idx >= len(lines):
-        return f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
+    return wrapper
 
-    # Format output with line numbers (cat -n format)
-    result_lines = []
-    for i in range(start_idx, end_idx):
-        line_content = lines[i]
 
-        # Truncate lines longer than 2000 characters
-        if len(line_content) > 2000:
-            line_content = line_content[:2000]
+def _create_file_tools(backend: Optional[FileBackend] = None):
+    """Create the built-in file tools.
 
-        # Line numbers start at 1, so add 1 to the index
-        line_number = i + 1
-        result_lines.append(f"{line_number:6d}\t{line_content}")
+    Files are stored through `backend`, which defaults to `StateBackend()`
+    (files kept in `state["files"]`).
+    """
+    backend = backend or StateBackend()
 
-    return "\n".join(result_lines)
+    @tool(description=LS_DESCRIPTION)
+    def ls(
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        path_prefix: str = "",
+        pattern: Optional[str] = None,
+        recursive: bool = True,
+        limit: int = 200,
+        cursor: Optional[str] = None,
+    ) -> str:
+        """List files"""
+        path_regex = compile_glob(pattern) if pattern else None
+        # The cursor is the last entry of the previous page; "dir/" entries
+        # resume after everything in that directory ("0" sorts right after "/")
+        if cursor:
+            position = cursor[:-1] + "0" if cursor.endswith("/") else cursor + "\0"
+        else:
+            position = path_prefix
+        entries = []
+        more = True
+        while more and len(entries) < limit:
+            more = False
+            for file_path, size in backend.iter_files(state, config, path_prefix, position):
+                if len(entries) >= limit:
+                    more = True
+                    break
+                name = file_path[len(path_prefix) :]
+                if not recursive and "/" in name:
+                    # Show the subdirectory once, then seek past everything in it
+                    directory = path_prefix + name[: name.index("/") + 1]
+                    entries.append(directory)
+                    position = directory[:-1] + "0"
+                    more = True
+                    break
+                position = file_path + "\0"
+                if path_regex is None or path_regex.match(file_path):
+                    entries.append(f"{file_path} ({size} {backend.size_unit})")
 
+        if more:
+            # Only report another page if anything left would be listed: a
+            # subdirectory, or a file matching the pattern
+            more = any(
+                (not recursive and "/" in file_path[len(path_prefix) :])
+                or path_regex is None
+                or path_regex.match(file_path)
+                for file_path, _ in backend.iter_files(state, config, path_prefix, position)
+            )
+        if not entries:
+            return f"No files found under '{path_prefix}'" if path_prefix else "No files found"
+        if more:
+            last = entries[-1] if entries[-1].endswith("/") else entries[-1].rsplit(" (", 1)[0]
+            entries.append(f"(More files available: call ls again with cursor={last!r})")
+        return "\n".join(entries)
 
-@tool
-def write_file(
-    file_path: str,
-    content: str,
-    state: Annotated[DeepAgentState, InjectedState],
-    tool_call_id: Annotated[str, InjectedToolCallId],
-) -> Command:
-    """Write to a file."""
-    files = state.get("files", {})
-    files[file_path] = content
-    return Command(
-        update={
-            "files": files,
-            "messages": [
-                ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
-            ],
-        }
-    )
+    def _read_lines(file_path, state, config, offset, limit):
+        """Return `(numbered lines, total line count)`, or an error/reminder string."""
+        content = backend.open(file_path, state, config)
+        if content is None:
+            return f"Error: File '{file_path}' not found"
 
+        # Handle empty file
+        if not content or content.isspace():
+            return "System reminder: File exists but has empty contents"
 
-@tool(description=EDIT_DESCRIPTION)
-def edit_file(
-    file_path: str,
-    old_string: str,
-    new_string: str,
-    state: Annotated[DeepAgentState, InjectedState],
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    replace_all: bool = False,
-) -> Command:
-    """Write to a file."""
-    mock_filesystem = state.get("files", {})
-    # Check if file exists in mock filesystem
-    if file_path not in mock_filesystem:
-        return f"Error: File '{file_path}' not found"
+        # Handle case where offset is beyond file length
+        line_count = content.line_count
+        if offset >= line_count:
+            return f"Error: Line offset {offset} exceeds file length ({line_count} lines)"
 
-    # Get current file content
-    content = mock_filesystem[file_path]
+        # Only the requested lines are sliced out of the file, truncating lines
+        # longer than 2000 characters
+        lines = content.read_lines(offset, limit, max_length=2000)
 
-    # Check if old_string exists in the file
-    if old_string not in content:
-        return f"Error: String not found in file: '{old_string}'"
+        # Format output with line numbers (cat -n format)
+        result_lines = []
+        for i, line_content in enumerate(lines):
+            # Line numbers start at 1, so add 1 to the index
+            line_number = offset + i + 1
+            result_lines.append(f"{line_number:6d}\t{line_content}")
+        return result_lines, line_count
 
-    # If not replace_all, check for uniqueness
-    if not replace_all:
-        occurrences = content.count(old_string)
-        if occurrences > 1:
-            return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
-        elif occurrences == 0:
-            return f"Error: String not found in file: '{old_string}'"
+    @tool(description=TOOL_DESCRIPTION)
+    @_path_errors
+    def read_file(
+        file_path: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        offset: int = 0,
+        limit: int = 2000,
+    ) -> str:
+        """Read file."""
+        result = _read_lines(file_path, state, config, offset, limit)
+        if isinstance(result, str):
+            return result
+        return "\n".join(result[0])
 
-    # Perform the replacement
-    if replace_all:
-        new_content = content.replace(old_string, new_string)
-        replacement_count = content.count(old_string)
-        result_msg = f"Successfully replaced {replacement_count} instance(s) of the string in '{file_path}'"
-    else:
-        new_content = content.replace(
-            old_string, new_string, 1
-        )  # Replace only first occurrence
-        result_msg = f"Successfully replaced string in '{file_path}'"
-
-    # Update the mock filesystem
-    mock_filesystem[file_path] = new_content
-    return Command(
-        update={
-            "files": mock_filesystem,
-            "messages": [ToolMessage(result_msg, tool_call_id=tool_call_id)],
-        }
-    )
+    @tool(description=READ_FILES_DESCRIPTION)
+    @_path_errors
+    def read_files(
+        files: list[FileReadRequest],
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        max_total_lines: int = 2000,
+        max_total_chars: int = 100000,
+    ) -> str:
+        """Read several files at once."""
+        sections = []
+        lines_left, chars_left = max_total_lines, max_total_chars
+        for i, request in enumerate(files):
+            file_path = request["file_path"]
+            if lines_left <= 0 or chars_left <= 0:
+                skipped = ", ".join(r["file_path"] for r in files[i:])
+                sections.append(f"(Read budget exhausted, not read: {skipped})")
+                break
+            offset = request.get("offset", 0)
+            limit = request.get("limit", 2000)
+            result = _read_lines(file_path, state, config, offset, min(limit, lines_left))
+            if isinstance(result, str):
+                sections.append(f"==> {file_path} <==\n{result}")
+                continue
+
+            # Take lines until the shared budget runs out
+            result_lines, line_count = result
+            body = []
+            for line in result_lines:
+                if len(line) + 1 > chars_left:
+                    break
+                body.append(line)
+                chars_left -= len(line) + 1
+            lines_left -= len(body)
+            next_offset = offset + len(body)
+            if len(body) < limit and next_offset < line_count:
+                body.append(
+                    f"(Read budget reached, continue with offset={next_offset})"
+                )
+            sections.append(f"==> {file_path} <==\n" + "\n".join(body))
+        return "\n\n".join(sections)
+
+    @tool
+    @_path_errors
+    def write_file(
+        file_path: str,
+        content: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command:
+        """Write to a file."""
+        return Command(
+            update={
+                "files": backend.write(file_path, FileContent(content), state, config),
+                "messages": [
+                    ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
+                ],
+            }
+        )
+
+    @tool(description=EDIT_DESCRIPTION)
+    @_path_errors
+    def edit_file(
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        tool_call_id: Annotated[str, InjectedToolCallId],
+        replace_all: bool = False,
+    ) -> Command:
+        """Write to a file."""
+        # Check if file exists
+        content = backend.read(file_path, state, config)
+        if content is None:
+            return f"Error: File '{file_path}' not found"
+
+        result = _replace(content, old_string, new_string, replace_all)
+        if isinstance(result, str):
+            return result
+        new_content, replacement_count = result
+        if replace_all:
+            result_msg = f"Successfully replaced {replacement_count} instance(s) of the string in '{file_path}'"
+        else:
+            result_msg = f"Successfully replaced string in '{file_path}'"
+
+        # Only the edited file is sent back as an update
+        return Command(
+            update={
+                "files": backend.write(file_path, new_content, state, config),
+                "messages": [ToolMessage(result_msg, tool_call_id=tool_call_id)],
+            }
+        )
+
+    @tool(description=MULTI_EDIT_DESCRIPTION)
+    @_path_errors
+    def multi_edit(
+        edits: list[FileEdit],
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command:
+        """Apply several edits at once."""
+        if not edits:
+            return "Error: No edits given"
+
+        # Validate and apply every edit in memory first, in order, so that a
+        # failing edit leaves all files untouched
+        new_contents = {}
+        replacement_count = 0
+        for i, edit in enumerate(edits, 1):
+            file_path = edit["file_path"]
+            if file_path not in new_contents:
+                content = backend.read(file_path, state, config)
+                if content is None:
+                    return f"Error: Edit {i} failed, no edits were applied. File '{file_path}' not found"
+                new_contents[file_path] = content
+            result = _replace(
+                new_contents[file_path],
+                edit["old_string"],
+                edit["new_string"],
+                edit.get("replace_all", False),
+            )
+            if isinstance(result, str):
+                reason = result.removeprefix("Error: ")
+                return f"Error: Edit {i} on '{file_path}' failed, no edits were applied. {reason}"
+            new_contents[file_path], count = result
+            replacement_count += count
+
+        # One delta covering every edited file; backends outside of the state
+        # write them all or none
+        files_update = backend.write_files(new_contents, state, config)
+        edited = ", ".join(f"'{file_path}'" for file_path in new_contents)
+        result_msg = f"Successfully applied {len(edits)} edit(s) ({replacement_count} replacement(s)) to {edited}"
+        return Command(
+            update={
+                "files": files_update,
+                "messages": [ToolMessage(result_msg, tool_call_id=tool_call_id)],
+            }
+        )
+
+    @tool(description=GREP_DESCRIPTION)
+    def grep(
+        pattern: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+        path_glob: Optional[str] = None,
+        context_lines: int = 0,
+        ignore_case: bool = False,
+        max_matches: int = 100,
+    ) -> str:
+        """Search file contents."""
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        try:
+            regex = re.compile(pattern, flags)
+        except re.error as e:
+            return f"Error: Invalid regex pattern '{pattern}': {e}"
+        path_regex = compile_glob(path_glob) if path_glob else None
+
+        # The index narrows the search down to files containing the pattern's literals
+        candidates = backend.search(required_literals(pattern), state, config)
+        groups = []
+        match_count = 0
+        for file_path in candidates:
+            if path_regex is not None and not path_regex.match(file_path):
+                continue
+            content = backend.read(file_path, state, config)
+            if content is None:
+                continue
+            matched = []
+            for match in regex.finditer(content):
+                line = content.line_number(match.start())
+                if not matched or matched[-1] != line:
+                    matched.append(line)
+                    match_count += 1
+                    if match_count >= max_matches:
+                        break
+            if not matched:
+                continue
+
+            # Merge the context windows around nearby matches
+            matched_set = set(matched)
+            window_start, window_end = None, None
+            for line in matched:
+                start = max(line - context_lines, 0)
+                end = min(line + context_lines + 1, content.line_count)
+                if window_end is not None and start <= window_end:
+                    window_end = max(window_end, end)
+                    continue
+                if window_end is not None:
+                    groups.append((file_path, content, matched_set, window_start, window_end))
+                window_start, window_end = start, end
+            groups.append((file_path, content, matched_set, window_start, window_end))
+            if match_count >= max_matches:
+                break
+
+        if not groups:
+            return f"No matches found for pattern '{pattern}'"
+        result = []
+        for file_path, content, matched_set, start, end in groups:
+            if result and context_lines:
+                result.append("--")
+            lines = content.read_lines(start, end - start, max_length=2000)
+            for i, line_content in enumerate(lines, start):
+                separator = ":" if i in matched_set else "-"
+                result.append(f"{file_path}{separator}{i + 1}{separator}{line_content}")
+        if match_count >= max_matches:
+            result.append(f"(Results truncated at {max_matches} matching lines)")
+        return "\n".join(result)
+
+    @tool(description=GLOB_DESCRIPTION)
+    def glob(
+        pattern: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        config: RunnableConfig,
+    ) -> list[str]:
+        """Find files by path pattern."""
+        path_regex = compile_glob(pattern)
+        return sorted(p for p in backend.ls(state, config) if path_regex.match(p))
+
+    # Classification for IsolatedToolNode
+    for read_tool in (ls, read_file, read_files, grep, glob):
+        read_only(read_tool)
+    writes_files(write_file, "file_path")
+    writes_files(edit_file, "file_path")
+    writes_files(multi_edit, "edits.file_path")
+    return [ls, read_file, read_files, write_file, edit_file, multi_edit, grep, glob]
+
+
+ls, read_file, read_files, write_file, edit_file, multi_edit, grep, glob = _create_file_tools()
+
+_file_tools_by_backend: "weakref.WeakKeyDictionary[FileBackend, list]" = weakref.WeakKeyDictionary()
+
+
+def _get_file_tools(backend: Optional[FileBackend] = None):
+    """Like `_create_file_tools`, but reuses the tools already made for `backend`.
+
+    Reusing the same tool objects lets agents built for the same backend share
+    cached subagent graphs.
+    """
+    if backend is None:
+        return [ls, read_file, read_files, write_file, edit_file, multi_edit, grep, glob]
+    file_tools = _file_tools_by_backend.get(backend)
+    if file_tools is None:
+        file_tools = _file_tools_by_backend[backend] = _create_file_tools(backend)
+    return file_tools
@@ -0,0 +1,63 @@
+"""A deterministic chat model for tests and benchmarks: it replays scripted responses."""
+
+import itertools
+from typing import Any, Callable, Sequence, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# A step is a final answer, a list of (tool name, args) calls, a ready-made
+# AIMessage, or a function of the conversation returning any of those
+Step = Union[str, list[tuple[str, dict[str, Any]]], AIMessage, Callable[[Sequence[BaseMessage]], Any]]
+
+_ids = itertools.count()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Returns `script[n]`, where n is the number of AI messages in the conversation.
+
+    Choosing the step from the conversation rather than from a counter means
+    one instance can serve the main agent and any number of concurrent
+    subagents, and each of them replays the script from the start. Steps
+    past the end of the script repeat the last one.
+    """
+
+    script: list[Any]
+    input_tokens_per_char: float = 0.25
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        turn = sum(isinstance(m, AIMessage) for m in messages)
+        step = self.script[min(turn, len(self.script) - 1)]
+        if callable(step):
+            step = step(messages)
+        if isinstance(step, AIMessage):
+            message = step.model_copy()
+        elif isinstance(step, str):
+            message = AIMessage(step)
+        else:
+            message = AIMessage(
+                "",
+                tool_calls=[
+                    {"name": name, "args": args, "id": f"call_{next(_ids)}"}
+                    for name, args in step
+                ],
+            )
+        input_chars = sum(len(str(m.content)) for m in messages)
+        input_tokens = int(input_chars * self.input_tokens_per_char)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": 10,
+            "total_tokens": input_tokens + 10,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._generate(messages, stop=stop, **kwargs)
@@ -0,0 +1,157 @@
+import sqlite3
+
+from langchain_core.messages import ToolMessage
+
+from deepagents.backends import InvalidPathError, LocalDirectoryBackend, SQLiteBackend
+from deepagents.files import FileContent
+from deepagents.tools import _create_file_tools
+
+import pytest
+
+
+def _tools(backend):
+    return {t.name: t for t in _create_file_tools(backend)}
+
+
+def _call(tool_, args, config):
+    call = {"name": tool_.name, "args": {**args, "state": {"messages": [], "files": {}}}, "id": "call-1", "type": "tool_call"}
+    result = tool_.invoke(call, config)
+    if isinstance(result, ToolMessage):
+        return result.content
+    return result.update["messages"][0].content
+
+
+@pytest.fixture
+def config():
+    return {"configurable": {"thread_id": "t1"}}
+
+
+def test_local_directory_round_trip(tmp_path, config):
+    backend = LocalDirectoryBackend(tmp_path)
+    tools = _tools(backend)
+    assert _call(tools["write_file"], {"file_path": "dir/a.txt", "content": "one\ntwo"}, config) == "Updated file dir/a.txt"
+    assert backend.ls({}, config) == ["dir/a.txt"]
+    assert "two" in _call(tools["read_file"], {"file_path": "dir/a.txt"}, config)
+
+
+@pytest.mark.parametrize("tool_name", ["read_file", "write_file", "edit_file"])
+def test_path_outside_directory_is_a_tool_error(tmp_path, config, tool_name):
+    tools = _tools(LocalDirectoryBackend(tmp_path))
+    args = {"file_path": "../../x", "content": "x", "old_string": "a", "new_string": "b"}
+    schema_args = tools[tool_name].args
+    content = _call(tools[tool_name], {k: v for k, v in args.items() if k in schema_args}, config)
+    assert content.startswith("Error: Path '../../x' is outside")
+    assert not (tmp_path.parent / "x").exists()
+
+
+def test_multi_edit_path_outside_directory_is_a_tool_error(tmp_path, config):
+    tools = _tools(LocalDirectoryBackend(tmp_path))
+    edits = [{"file_path": "/../../x", "old_string": "a", "new_string": "b"}]
+    assert _call(tools["multi_edit"], {"edits": edits}, config).startswith("Error: Path")
+
+
+def test_backend_directory_itself_is_invalid(tmp_path, config):
+    with pytest.raises(InvalidPathError):
+        LocalDirectoryBackend(tmp_path).write("", "x", {}, config)
+
+
+@pytest.mark.parametrize("thread_id", ["../../escape", "..", ".", "a/b", ""])
+def test_thread_directory_stays_under_root(tmp_path, thread_id):
+    root = tmp_path / "root"
+    backend = LocalDirectoryBackend(root)
+    config = {"configurable": {"thread_id": thread_id}}
+    backend.write("a.txt", "x", {}, config)
+    written = [p for p in tmp_path.rglob("a.txt")]
+    assert len(written) == 1
+    assert root.resolve() in written[0].resolve().parents
+    assert backend.ls({}, config) == ["a.txt"]
+
+
+def test_thread_directories_are_separate(tmp_path):
+    backend = LocalDirectoryBackend(tmp_path)
+    backend.write("a.txt", "1", {}, {"configurable": {"thread_id": "../x"}})
+    assert backend.ls({}, {"configurable": {"thread_id": "x"}}) == []
+
+
+def test_user_tmp_files_are_listed(tmp_path, config):
+    backend = LocalDirectoryBackend(tmp_path)
+    backend.write("notes.tmp", "keep me", {}, config)
+    backend.write("b.txt", "b", {}, config)
+    # A write cut off before its rename
+    (backend._directory(config) / ".b.txt.deepagents-1-2.partial").write_text("partial")
+    assert backend.ls({}, config) == ["b.txt", "notes.tmp"]
+    tools = _tools(backend)
+    assert "notes.tmp" in _call(tools["glob"], {"pattern": "*.tmp"}, config)
+    assert "notes.tmp" in _call(tools["grep"], {"pattern": "keep"}, config)
+
+
+def test_sqlite_namespaces(tmp_path):
+    backend = SQLiteBackend(tmp_path / "files.db")
+    backend.write("a.txt", "1", {}, {"configurable": {"thread_id": "t1"}})
+    assert backend.ls({}, {"configurable": {"thread_id": "t1"}}) == ["a.txt"]
+    assert backend.ls({}, {"configurable": {"thread_id": "t2"}}) == []
+
+
+def _partial_files(tmp_path):
+    return [p for p in tmp_path.rglob("*") if p.name.endswith(".partial")]
+
+
+@pytest.mark.parametrize("tool_name", ["read_file", "edit_file"])
+def test_path_under_a_file_is_not_found(tmp_path, config, tool_name):
+    tools = _tools(LocalDirectoryBackend(tmp_path))
+    _call(tools["write_file"], {"file_path": "a.txt", "content": "a"}, config)
+    args = {"file_path": "a.txt/b", "old_string": "a", "new_string": "b"}
+    schema_args = tools[tool_name].args
+    content = _call(tools[tool_name], {k: v for k, v in args.items() if k in schema_args}, config)
+    assert content == "Error: File 'a.txt/b' not found"
+
+
+@pytest.mark.parametrize("file_path", ["a.txt/b", "dir"])
+def test_unwritable_paths_are_tool_errors(tmp_path, config, file_path):
+    backend = LocalDirectoryBackend(tmp_path)
+    tools = _tools(backend)
+    _call(tools["write_file"], {"file_path": "a.txt", "content": "a"}, config)
+    _call(tools["write_file"], {"file_path": "dir/c.txt", "content": "c"}, config)
+    content = _call(tools["write_file"], {"file_path": file_path, "content": "x"}, config)
+    assert content.startswith(f"Error: Cannot write '{file_path}'")
+    assert _partial_files(tmp_path) == []
+    assert backend.ls({}, config) == ["a.txt", "dir/c.txt"]
+
+
+def test_failed_local_multi_edit_changes_nothing(tmp_path, config, monkeypatch):
+    backend = LocalDirectoryBackend(tmp_path)
+    tools = _tools(backend)
+    for name in ("a.txt", "b.txt"):
+        _call(tools["write_file"], {"file_path": name, "content": "old"}, config)
+    write_text = type(tmp_path).write_text
+    calls = []
+
+    def fail_second(self, *args, **kwargs):
+        calls.append(self)
+        if len(calls) == 2:
+            raise OSError(28, "No space left on device")
+        return write_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(tmp_path), "write_text", fail_second)
+    edits = [{"file_path": name, "old_string": "old", "new_string": "new"} for name in ("a.txt", "b.txt")]
+    content = _call(tools["multi_edit"], {"edits": edits}, config)
+    assert content == "Error: Cannot write 'b.txt': No space left on device"
+    monkeypatch.undo()
+    assert [backend.read(name, {}, config) for name in ("a.txt", "b.txt")] == ["old", "old"]
+    assert _partial_files(tmp_path) == []
+
+
+def test_sqlite_write_files_is_one_transaction(tmp_path, config):
+    backend = SQLiteBackend(tmp_path / "files.db")
+    backend.write_files({"a.txt": FileContent("old"), "b.txt": FileContent("old")}, {}, config)
+    backend._conn.execute(
+        "CREATE TRIGGER no_b BEFORE UPDATE ON files WHEN NEW.path = 'b.txt' "
+        "BEGIN SELECT RAISE(ABORT, 'b.txt is locked'); END"
+    )
+    with pytest.raises(sqlite3.DatabaseError):
+        backend.write_files({"a.txt": FileContent("new"), "b.txt": FileContent("new")}, {}, config)
+    assert backend.read("a.txt", {}, config) == "old"
+    # The rolled back version never reached the cache
+    backend._conn.execute("DROP TRIGGER no_b")
+    backend.write("a.txt", "newer", {}, config)
+    assert backend.read("a.txt", {}, config) == "newer"
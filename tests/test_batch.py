@@ -0,0 +1,51 @@
+import json
+
+from fake_model import ScriptedChatModel
+
+from deepagents import create_deep_agent
+from deepagents.backends import StateBackend
+from deepagents.batch import run_batch
+from deepagents.blobs import InMemoryBlobStore
+from deepagents.factory import DeepAgentFactory
+
+SCRIPT = [[("write_file", {"file_path": "notes.md", "content": "some notes"})], "done"]
+
+
+def _results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batch_writes_results(tmp_path):
+    agent = create_deep_agent([], "Test agent.", model=ScriptedChatModel(script=SCRIPT))
+    counts = run_batch(agent, ["a", "b"], tmp_path / "results.jsonl")
+    assert counts == {"success": 2, "error": 0, "interrupted": 0, "skipped": 0}
+    assert [r["files"] for r in _results(tmp_path / "results.jsonl")] == [{"notes.md": "some notes"}] * 2
+
+    counts = run_batch(agent, ["a", "b"], tmp_path / "results.jsonl")
+    assert counts["skipped"] == 2
+
+
+def test_blob_files_without_their_backend_are_per_item_errors(tmp_path):
+    agent = create_deep_agent(
+        [], "Test agent.", model=ScriptedChatModel(script=SCRIPT), blob_store=InMemoryBlobStore()
+    )
+    counts = run_batch(agent, ["a", "b"], tmp_path / "results.jsonl")
+    assert counts == {"success": 0, "error": 2, "interrupted": 0, "skipped": 0}
+    assert all("blob store" in r["error"] for r in _results(tmp_path / "results.jsonl"))
+
+
+def test_blob_files_are_read_through_the_agents_backend(tmp_path):
+    blob_store = InMemoryBlobStore()
+    agent = create_deep_agent([], "Test agent.", model=ScriptedChatModel(script=SCRIPT), blob_store=blob_store)
+    counts = run_batch(agent, ["a"], tmp_path / "results.jsonl", file_backend=StateBackend(blob_store))
+    assert counts["success"] == 1
+    assert _results(tmp_path / "results.jsonl")[0]["files"] == {"notes.md": "some notes"}
+
+
+def test_factory_supplies_its_backend(tmp_path):
+    factory = DeepAgentFactory(
+        [], "Test agent.", model=ScriptedChatModel(script=SCRIPT), blob_store=InMemoryBlobStore()
+    )
+    counts = run_batch(factory, ["a"], tmp_path / "results.jsonl")
+    assert counts["success"] == 1
+    assert _results(tmp_path / "results.jsonl")[0]["files"] == {"notes.md": "some notes"}
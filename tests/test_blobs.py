@@ -0,0 +1,61 @@
+from langchain_core.messages import ToolMessage
+
+from deepagents.backends import StateBackend
+from deepagents.blobs import InMemoryBlobStore, LocalDirectoryBlobStore, SQLiteBlobStore, is_blob_ref
+from deepagents.files import FileContent, content_digest
+from deepagents.tools import _create_file_tools
+
+import pytest
+
+BODIES = ["", "plain text", "a\r\nb\rc\n", "\r\n\r\n", "café   \U0001f600", "lone \ud800 surrogate"]
+
+
+@pytest.fixture(params=["memory", "directory", "sqlite"])
+def make_store(request, tmp_path):
+    # Each call returns a new store over the same storage, with a cold cache
+    def make():
+        if request.param == "memory":
+            if not hasattr(make, "store"):
+                make.store = InMemoryBlobStore()
+            return make.store
+        if request.param == "directory":
+            return LocalDirectoryBlobStore(tmp_path / "blobs")
+        return SQLiteBlobStore(tmp_path / "blobs.db")
+
+    return make
+
+
+@pytest.mark.parametrize("body", BODIES)
+def test_round_trip(make_store, body):
+    ref = make_store().put(body)
+    assert ref == {"blob": content_digest(body), "size": len(body)}
+    content = make_store().get(ref)
+    assert content == body and isinstance(content, FileContent)
+    assert content_digest(content) == ref["blob"]
+
+
+def test_bodies_are_deduplicated(make_store):
+    store = make_store()
+    assert store.put("same") == store.put(FileContent("same"))
+    assert make_store().get({"blob": content_digest("other"), "size": 5}) is None
+
+
+def test_resolve_files(make_store):
+    store = make_store()
+    files = {"a.txt": store.put("stored"), "b.txt": "inline"}
+    assert is_blob_ref(files["a.txt"])
+    assert store.resolve_files(files) == {"a.txt": "stored", "b.txt": "inline"}
+
+
+def test_write_file_with_a_lone_surrogate(make_store):
+    backend = StateBackend(make_store())
+    write_file = {t.name: t for t in _create_file_tools(backend)}["write_file"]
+    call = {
+        "name": "write_file",
+        "args": {"file_path": "a.txt", "content": "x\ud800y", "state": {"messages": [], "files": {}}},
+        "id": "call-1",
+        "type": "tool_call",
+    }
+    result = write_file.invoke(call)
+    assert not isinstance(result, ToolMessage)
+    assert backend.read("a.txt", {"files": result.update["files"]}, {}) == "x\ud800y"
@@ -0,0 +1,66 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from deepagents.compaction import create_compaction_hook, tool_result_path
+from deepagents.spill import spill_large_outputs
+from deepagents.state import file_reducer
+
+CONFIG = {"configurable": {"thread_id": "t1"}}
+
+
+@tool
+def big_search(query: str) -> str:
+    """Return a lot of text."""
+    return "".join(f"line {i} of the result\n" for i in range(2500))
+
+
+def _compact(messages, files):
+    hook = create_compaction_hook(
+        {"max_tokens": 100, "target_tokens": 10, "keep_last": 1, "min_result_chars": 100}
+    )
+    return hook({"messages": messages, "files": files}, CONFIG)
+
+
+def _history(tool_message):
+    call = {"name": tool_message.name, "args": {}, "id": tool_message.tool_call_id}
+    return [HumanMessage("go", id="h"), AIMessage("", tool_calls=[call], id="a"), tool_message, HumanMessage("next", id="n")]
+
+
+def test_compaction_keeps_spilled_output():
+    (spilling,) = spill_large_outputs([big_search], max_chars=20_000)
+    full = big_search.invoke({"query": "x"})
+    result = spilling.invoke({"name": "big_search", "args": {"query": "x"}, "id": "call-1", "type": "tool_call"})
+    files = file_reducer({}, result.update["files"])
+    spilled = result.update["messages"][0]
+    spilled.id = "m1"
+    assert len(full) > 50_000 and files[tool_result_path("call-1")] == full
+
+    update = _compact(_history(spilled), files)
+
+    files = file_reducer(files, update.get("files"))
+    assert files[tool_result_path("call-1")] == full
+    (stub,) = update["messages"]
+    assert tool_result_path("call-1") in stub.content
+    assert f"({len(full)} characters)" in stub.content
+
+
+def test_compaction_never_overwrites_a_file():
+    files = file_reducer({}, {tool_result_path("call-1"): "the model's own notes"})
+    message = ToolMessage("x" * 5000, tool_call_id="call-1", name="search", id="m1")
+
+    update = _compact(_history(message), files)
+
+    files = file_reducer(files, update["files"])
+    assert files[tool_result_path("call-1")] == "the model's own notes"
+    assert files[tool_result_path("call-1", 1)] == "x" * 5000
+    assert tool_result_path("call-1", 1) in update["messages"][0].content
+
+
+def test_compaction_reuses_an_identical_file():
+    files = file_reducer({}, {tool_result_path("call-1"): "x" * 5000})
+    message = ToolMessage("x" * 5000, tool_call_id="call-1", name="search", id="m1")
+
+    update = _compact(_history(message), files)
+
+    assert "files" not in update
+    assert tool_result_path("call-1") in update["messages"][0].content
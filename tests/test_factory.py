@@ -0,0 +1,36 @@
+from fake_model import ScriptedChatModel
+from langchain_core.tools import tool
+
+from deepagents.factory import DeepAgentFactory
+from deepagents.graph import BUILTIN_TOOL_NAMES
+
+import pytest
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+def _factory(**kwargs):
+    return DeepAgentFactory([lookup], "Test agent.", model=ScriptedChatModel(script=["done"]), **kwargs)
+
+
+def test_builtin_tools_default_to_all():
+    assert _factory().tool_names == ["lookup", *BUILTIN_TOOL_NAMES]
+
+
+def test_empty_builtin_tools_means_none():
+    factory = _factory(builtin_tools=[])
+    assert factory.tool_names == ["lookup"]
+    with pytest.raises(ValueError, match="Unknown tools"):
+        factory.get_agent(["read_file"])
+    result = factory.get_agent().invoke({"messages": [{"role": "user", "content": "go"}]})
+    assert result["messages"][-1].content == "done"
+
+
+def test_selected_builtin_tools():
+    factory = _factory(builtin_tools=["read_file"])
+    assert factory.tool_names == ["lookup", "read_file"]
+    factory.get_agent(["read_file"])
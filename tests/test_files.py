@@ -0,0 +1,75 @@
+import random
+
+from deepagents.files import FileContent, FileMap, FileOverlay
+
+import pytest
+
+PIECES = ["a", "bc", "\n", "\r", "\r\n", "\x0b", " ", "line\n", ""]
+
+
+def _random_text(rng, pieces):
+    return "".join(rng.choice(PIECES) for _ in range(pieces))
+
+
+def _indexed(text):
+    content = FileContent(text)
+    content.line_count
+    return content
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_splice_keeps_the_line_index_exact(seed):
+    rng = random.Random(seed)
+    content = _indexed(_random_text(rng, 40))
+    for _ in range(30):
+        start = rng.randint(0, len(content))
+        end = rng.randint(start, len(content))
+        content = content.splice(start, end, _random_text(rng, rng.randint(0, 6)))
+        assert content.read_lines(0, 10**6) == str(content).splitlines()
+        assert content._index() == _indexed(str(content))._index()
+
+
+def test_splice_merges_a_carriage_return_with_an_inserted_newline():
+    content = _indexed("one\rtwo")
+    spliced = content.splice(4, 4, "\n")
+    assert spliced == "one\r\ntwo"
+    assert spliced.read_lines(0, 10) == ["one", "two"]
+    assert spliced.line_count == 2
+
+
+def test_unindexed_splice_stays_lazy():
+    spliced = FileContent("a\nb").splice(0, 1, "x")
+    assert spliced == "x\nb" and spliced._starts is None
+
+
+def test_read_lines_truncates_long_lines():
+    content = FileContent("short\n" + "x" * 50 + "\nend")
+    assert content.read_lines(1, 2, max_length=10) == ["x" * 10, "end"]
+    assert content.line_number(content.index("end")) == 2
+
+
+def test_file_map_keeps_paths_sorted():
+    files = FileMap({"b": "1", "d": "2"})
+    assert files.sorted_paths() == ["b", "d"]
+    files.apply({"a": "3", "d": None, "c": "4"})
+    assert files.sorted_paths() == ["a", "b", "c"]
+    copy = files.updated({"b": None, "e": "5"})
+    assert copy.sorted_paths() == ["a", "c", "e"]
+    assert files.sorted_paths() == ["a", "b", "c"]
+    assert isinstance(copy["e"], FileContent)
+
+
+def test_overlay_changes_are_only_what_was_written():
+    parent = FileMap({"a": "1", "b": "2", "c": "3"})
+    overlay = FileOverlay(parent, ["a", "b"])
+    assert dict(overlay) == {"a": "1", "b": "2"}
+    assert overlay.changes() == {}
+
+    overlay.apply({"a": "changed", "new": "4", "b": None})
+    assert overlay.changes() == {"a": "changed", "new": "4", "b": None}
+    assert dict(parent) == {"a": "1", "b": "2", "c": "3"}
+
+
+def test_overlay_ignores_rewrites_with_the_same_contents():
+    overlay = FileOverlay({"a": "1"})
+    assert overlay.changes({"a": FileContent("1"), "b": "2"}) == {"b": "2"}
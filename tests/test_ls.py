@@ -0,0 +1,110 @@
+import itertools
+import os
+import random
+
+import pytest
+
+from deepagents.backends import LocalDirectoryBackend, StateBackend
+from deepagents.state import file_reducer
+from deepagents.tools import _create_file_tools
+
+CONFIG = {"configurable": {"thread_id": "t"}}
+
+
+def _ls(backend, state, **args):
+    ls = _create_file_tools(backend)[0]
+    return ls.invoke({**args, "state": {"messages": [], **state}}, CONFIG)
+
+
+def test_pages_with_pattern_stop_when_nothing_else_matches():
+    files = {f"src/{i:02}.py": "x" for i in range(3)}
+    files.update({f"src/{i:02}.txt": "x" for i in range(3, 40)})
+    state = {"files": file_reducer({}, files)}
+    page = _ls(StateBackend(), state, pattern="**/*.py", limit=3)
+    assert page.splitlines() == [f"src/{i:02}.py (1 chars)" for i in range(3)]
+
+
+def test_pages_with_pattern_continue_to_next_match():
+    files = {"a.py": "x", "b.py": "x", "c.txt": "x", "d.txt": "x", "e.py": "x"}
+    state = {"files": file_reducer({}, files)}
+    page = _ls(StateBackend(), state, pattern="*.py", limit=2)
+    assert "cursor='b.py'" in page
+    page = _ls(StateBackend(), state, pattern="*.py", limit=2, cursor="b.py")
+    assert page == "e.py (1 chars)"
+
+
+def test_non_recursive_listing_pages_through_directories():
+    files = {"a/1.txt": "x", "a/2.txt": "x", "b.txt": "x", "c/3.txt": "x"}
+    state = {"files": file_reducer({}, files)}
+    page = _ls(StateBackend(), state, recursive=False, limit=2)
+    assert page.splitlines()[:2] == ["a/", "b.txt (1 chars)"]
+    assert _ls(StateBackend(), state, recursive=False, limit=2, cursor="b.txt") == "c/"
+
+
+def _tree(root, paths):
+    for path in paths:
+        target = root / "t" / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x" * len(path))
+
+
+def test_local_directory_iter_files_matches_sorted_paths(tmp_path):
+    rng = random.Random(0)
+    names = ["a", "a-b", "a.b", "ab", "b", "z", "a0", "_"]
+    paths = set()
+    for _ in range(150):
+        depth = rng.randint(1, 3)
+        paths.add("/".join(rng.choice(names) for _ in range(depth)) + rng.choice(["", ".txt", "-1"]))
+    # A name can't be both a file and a directory
+    paths = {p for p in paths if not any(q.startswith(p + "/") for q in paths)}
+    _tree(tmp_path, paths)
+    backend = LocalDirectoryBackend(tmp_path)
+    expected = sorted(paths)
+    assert [p for p, _ in backend.iter_files({}, CONFIG)] == expected
+    for prefix, start in itertools.product(["", "a", "a/", "a-b/", "ab/a", "zz"], ["", "a.b", "a/b", "b"]):
+        got = [p for p, _ in backend.iter_files({}, CONFIG, prefix, start)]
+        assert got == [p for p in expected if p.startswith(prefix) and p >= start], (prefix, start)
+
+
+def test_local_directory_iter_files_skips_unrelated_directories(tmp_path, monkeypatch):
+    _tree(tmp_path, [f"d{i:03}/f.txt" for i in range(200)] + ["target/f.txt"])
+    backend = LocalDirectoryBackend(tmp_path)
+    scanned = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    assert [p for p, _ in backend.iter_files({}, CONFIG, "target/")] == ["target/f.txt"]
+    first_page = list(itertools.islice(backend.iter_files({}, CONFIG, "", "d100/"), 2))
+    assert first_page[0][0] == "d100/f.txt"
+    assert len(scanned) <= 5
+
+
+@pytest.mark.parametrize("recursive", [True, False])
+def test_local_directory_ls_pages(tmp_path, recursive):
+    _tree(tmp_path, [f"dir/{i}.txt" for i in range(5)] + ["top.txt"])
+    backend = LocalDirectoryBackend(tmp_path)
+    listed, cursor = [], None
+    for _ in range(10):
+        page = _ls(backend, {"files": {}}, recursive=recursive, limit=2, **({"cursor": cursor} if cursor else {}))
+        lines = page.splitlines()
+        if lines[-1].startswith("(More"):
+            cursor = lines[-1].split("cursor=")[1][1:-2]
+            listed += lines[:-1]
+        else:
+            listed += lines
+            break
+    names = [line.split(" (")[0] for line in listed]
+    assert names == ([f"dir/{i}.txt" for i in range(5)] + ["top.txt"] if recursive else ["dir/", "top.txt"])
+
+
+def test_sizes_are_labeled_in_each_backends_unit(tmp_path):
+    text = "café \U0001f600"
+    state = {"files": file_reducer({}, {"a.txt": text})}
+    assert _ls(StateBackend(), state) == f"a.txt ({len(text)} chars)"
+    backend = LocalDirectoryBackend(tmp_path, per_thread=False)
+    backend.write("a.txt", text, {}, CONFIG)
+    assert _ls(backend, {"files": {}}) == f"a.txt ({len(text.encode())} bytes)"
@@ -0,0 +1,85 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from deepagents import registry as registry_module
+from deepagents.registry import ModelRegistry
+
+import pytest
+
+MESSAGE = {
+    "id": "msg_1",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-test",
+    "content": [{"type": "text", "text": "hi"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 1, "output_tokens": 1},
+}
+
+
+class _MessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps(MESSAGE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MessagesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _settings(endpoint, **kwargs):
+    return {"model": "claude-test", "model_provider": "anthropic", "base_url": endpoint, "api_key": "test", **kwargs}
+
+
+def test_equal_settings_share_one_model(endpoint):
+    registry = ModelRegistry()
+    model = registry.get(_settings(endpoint))
+    assert registry.get(_settings(endpoint)) is model
+    assert registry.get(_settings(endpoint, temperature=0)) is not model
+    assert registry.stats()["models"] == 2 and registry.stats()["hits"] == 1
+
+
+def test_models_for_one_endpoint_share_connections(endpoint):
+    registry = ModelRegistry()
+    first = registry.get(_settings(endpoint))
+    second = registry.get(_settings(endpoint, temperature=0))
+    assert first.invoke("hello").content == "hi"
+    assert second.invoke("hello").content == "hi"
+    assert registry.stats()["endpoints"] == {
+        f"anthropic {endpoint}": {"requests": 2, "connections": 1, "reused": 1}
+    }
+
+
+def test_models_that_cannot_share_a_pool_are_logged(endpoint, monkeypatch, caplog):
+    monkeypatch.setattr(registry_module, "_ANTHROPIC_CLIENT_PROPERTIES", ("_client", "_renamed_client"))
+    registry = ModelRegistry()
+    with caplog.at_level(logging.WARNING, logger="deepagents.registry"):
+        model = registry.get(_settings(endpoint))
+    assert "shared connection pool" in caplog.text
+    assert model.invoke("hello").content == "hi"
+    assert registry.stats()["endpoints"] == {}
+
+
+def test_sharing_can_be_turned_off(endpoint):
+    registry = ModelRegistry(share_connections=False)
+    assert registry.get(_settings(endpoint)).invoke("hello").content == "hi"
+    assert registry.stats()["endpoints"] == {}
@@ -0,0 +1,53 @@
+from deepagents.result_cache import InMemoryResultCache, SQLiteResultCache, result_cache_key
+
+import pytest
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return InMemoryResultCache(**kwargs)
+        return SQLiteResultCache(tmp_path / "results.db", **kwargs)
+
+    return make
+
+
+def test_key_ignores_whitespace_but_not_prompt_or_files():
+    key = result_cache_key("research", "prompt", "find  the\nthing ", "digest")
+    assert key == result_cache_key("research", "prompt", "find the thing", "digest")
+    assert key != result_cache_key("research", "other prompt", "find the thing", "digest")
+    assert key != result_cache_key("research", "prompt", "find the thing", "other digest")
+    # Parts are length-prefixed, so moving text between them changes the key
+    assert result_cache_key("ab", "c", "d", "e") != result_cache_key("a", "bc", "d", "e")
+
+
+def test_get_and_put(make_cache):
+    cache = make_cache()
+    assert cache.get("k") is None
+    cache.put("k", {"content": "answer", "files": {"notes.md": "n"}})
+    assert cache.get("k") == {"content": "answer", "files": {"notes.md": "n"}}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+
+def test_least_recently_used_is_evicted(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.put("a", {"content": "a", "files": {}})
+    cache.put("b", {"content": "b", "files": {}})
+    cache.get("a")
+    cache.put("c", {"content": "c", "files": {}})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_expired_results_are_misses(make_cache, monkeypatch):
+    cache = make_cache(ttl=10)
+    now = 1000.0
+    monkeypatch.setattr("deepagents.result_cache.time.time", lambda: now)
+    cache.put("k", {"content": "answer", "files": {}})
+    now += 5
+    assert cache.get("k") is not None
+    now += 10
+    assert cache.get("k") is None
+    assert len(cache) == 0
@@ -0,0 +1,110 @@
+import asyncio
+
+from fake_model import ScriptedChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from deepagents import create_deep_agent
+from deepagents.routing import ModelRouter
+
+import pytest
+
+
+def _router(fast_script=("fast answer",), strong_script=("strong answer",), **kwargs):
+    return ModelRouter(
+        fast=ScriptedChatModel(script=list(fast_script)),
+        strong=ScriptedChatModel(script=list(strong_script)),
+        **kwargs,
+    )
+
+
+def _after(*tool_names, text="ok"):
+    calls = [{"name": name, "args": {}, "id": f"c{i}"} for i, name in enumerate(tool_names)]
+    return [
+        HumanMessage("go"),
+        AIMessage("", tool_calls=calls),
+        *(ToolMessage(text, name=name, tool_call_id=f"c{i}") for i, name in enumerate(tool_names)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "messages, tier",
+    [
+        ([HumanMessage("go")], "strong"),
+        (_after("ls"), "fast"),
+        (_after("write_todos", "read_file"), "fast"),
+        (_after("internet_search"), "strong"),
+        (_after("ls", "internet_search"), "strong"),
+    ],
+)
+def test_default_route_follows_the_last_tool_results(messages, tier):
+    assert _router().default_route(messages, {}) == tier
+
+
+def test_long_contexts_go_to_the_strong_model():
+    router = _router(max_fast_tokens=100)
+    assert router.default_route(_after("ls", text="short"), {}) == "fast"
+    assert router.default_route(_after("ls", text="word " * 1000), {}) == "strong"
+
+
+def test_subagent_tiers_pin_a_subagent_type():
+    router = _router(subagent_tiers={"summarizer": "fast", "planner": "strong"})
+    assert router.default_route([HumanMessage("go")], {"metadata": {"subagent_type": "summarizer"}}) == "fast"
+    assert router.default_route(_after("ls"), {"metadata": {"subagent_type": "planner"}}) == "strong"
+    assert router.default_route(_after("ls"), {"metadata": {"subagent_type": "other"}}) == "fast"
+
+
+def test_custom_route():
+    router = _router(route=lambda messages, config: "fast")
+    assert router.invoke([HumanMessage("go")]).content == "fast answer"
+
+
+def _raise(messages):
+    raise RuntimeError("fast model failed")
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_escalates_when_the_fast_model_raises(use_async):
+    router = _router(fast_script=[_raise])
+    messages = _after("ls")
+    if use_async:
+        message = asyncio.run(router.ainvoke(messages))
+    else:
+        message = router.invoke(messages)
+    assert message.content == "strong answer"
+    stats = router.stats()
+    assert stats["fast"]["calls"] == 1 and stats["fast"]["errors"] == 1 and stats["fast"]["escalations"] == 1
+    assert stats["strong"]["calls"] == 1 and stats["strong"]["errors"] == 0
+
+
+def test_escalates_on_invalid_tool_calls():
+    malformed = AIMessage("", invalid_tool_calls=[{"name": "ls", "args": "{not json", "id": "c1", "error": "bad"}])
+    router = _router(fast_script=[malformed])
+    assert router.invoke(_after("ls")).content == "strong answer"
+    assert router.stats()["fast"]["escalations"] == 1
+
+
+def test_no_escalation_when_turned_off():
+    router = _router(fast_script=[_raise], escalate=False)
+    with pytest.raises(RuntimeError):
+        router.invoke(_after("ls"))
+    assert router.stats()["strong"]["calls"] == 0
+
+
+def test_bound_routers_share_stats():
+    router = _router()
+    bound = router.bind_tools([])
+    assert bound is not router
+    bound.invoke([HumanMessage("go")])
+    bound.invoke(_after("ls"))
+    stats = router.stats()
+    assert stats["fast"]["calls"] == 1 and stats["strong"]["calls"] == 1
+    assert stats["fast"]["input_tokens"] > 0 and stats["strong"]["avg_latency"] is not None
+
+
+def test_agent_steps_after_fast_tools_use_the_fast_model():
+    router = _router(strong_script=[[("ls", {})], "done"], fast_script=["done"])
+    agent = create_deep_agent([], "Test agent.", model=router)
+    result = agent.invoke({"messages": [{"role": "user", "content": "go"}]})
+    assert result["messages"][-1].content == "done"
+    stats = router.stats()
+    assert stats["strong"]["calls"] == 1 and stats["fast"]["calls"] == 1
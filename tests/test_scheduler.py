@@ -0,0 +1,92 @@
+import asyncio
+
+from deepagents.scheduler import TaskScheduler
+
+import pytest
+
+
+async def _job(scheduler, subagent_type, running, peak, order=None, hold=0.01):
+    async with scheduler.slot(subagent_type):
+        if order is not None:
+            order.append(subagent_type)
+        running[subagent_type] = running.get(subagent_type, 0) + 1
+        running["all"] = running.get("all", 0) + 1
+        for key in (subagent_type, "all"):
+            peak[key] = max(peak.get(key, 0), running[key])
+        await asyncio.sleep(hold)
+        running[subagent_type] -= 1
+        running["all"] -= 1
+
+
+def test_limits_are_respected():
+    scheduler = TaskScheduler(max_concurrency=3, max_concurrency_per_subagent={"slow": 1})
+    running, peak = {}, {}
+
+    async def main():
+        await asyncio.gather(
+            *(_job(scheduler, "slow", running, peak) for _ in range(4)),
+            *(_job(scheduler, "fast", running, peak) for _ in range(6)),
+        )
+
+    asyncio.run(main())
+    assert peak["slow"] == 1 and peak["all"] == 3
+    metrics = scheduler.metrics()
+    assert metrics["slow"]["completed"] == 4 and metrics["fast"]["completed"] == 6
+    assert metrics["slow"]["running"] == 0 and metrics["slow"]["queued"] == 0
+
+
+def test_a_type_at_its_limit_does_not_block_others():
+    scheduler = TaskScheduler(max_concurrency=2, max_concurrency_per_subagent={"a": 1})
+    order = []
+
+    async def main():
+        await asyncio.gather(
+            _job(scheduler, "a", {}, {}, order, hold=0.05),
+            _job(scheduler, "a", {}, {}, order, hold=0.01),
+            _job(scheduler, "b", {}, {}, order, hold=0.01),
+        )
+
+    asyncio.run(main())
+    assert order == ["a", "b", "a"]
+
+
+def test_priority_queue_starts_higher_priorities_first():
+    scheduler = TaskScheduler(max_concurrency=1, queue="priority", priorities={"urgent": 10})
+    order = []
+
+    async def main():
+        first = asyncio.create_task(_job(scheduler, "first", {}, {}, order, hold=0.02))
+        await asyncio.sleep(0)
+        await asyncio.gather(
+            first,
+            _job(scheduler, "normal", {}, {}, order),
+            _job(scheduler, "urgent", {}, {}, order),
+        )
+
+    asyncio.run(main())
+    assert order == ["first", "urgent", "normal"]
+
+
+def test_cancelled_waiters_give_up_their_place():
+    scheduler = TaskScheduler(max_concurrency=1)
+    order = []
+
+    async def main():
+        holder = asyncio.create_task(_job(scheduler, "a", {}, {}, order, hold=0.02))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(_job(scheduler, "b", {}, {}, order))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(holder, _job(scheduler, "c", {}, {}, order))
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert order == ["a", "c"]
+    assert scheduler.metrics()["b"]["started"] == 0
+    assert all(m["running"] == 0 for m in scheduler.metrics().values())
+
+
+def test_unknown_queue_mode():
+    with pytest.raises(ValueError):
+        TaskScheduler(queue="lifo")
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from deepagents.backends import StateBackend
+from deepagents.files import FileOverlay
+from deepagents.search import SearchIndex, compile_glob, required_literals
+from deepagents.state import file_reducer
+from deepagents.tools import grep
+
+
+def test_required_literals():
+    assert required_literals("def foo_bar") == ["def foo_bar"]
+    assert required_literals(r"class \w+Error") == ["class ", "Error"]
+    assert required_literals("foo|bar") == []
+    assert required_literals("ab?cdef") == ["cdef"]
+    assert required_literals(r"a\.b\+c") == ["a.b+c"]
+
+
+@pytest.mark.parametrize(
+    "pattern", [r"\x41BCD", r"\101BCD", r"\u0041BCD", r"\U00000041BCD", r"\N{LATIN CAPITAL LETTER A}BCD", r"\0BCD"]
+)
+def test_character_escapes_are_not_literal_text(pattern):
+    assert required_literals(pattern) == ["BCD"]
+    state = {"messages": [], "files": file_reducer({}, {"a.txt": "xx ABCD yy", "b.txt": "xx \0BCD yy"})}
+    call = {"name": "grep", "args": {"pattern": pattern, "state": state}, "id": "call-1", "type": "tool_call"}
+    assert grep.invoke(call).content.startswith("a.txt" if "0BCD" not in pattern else "b.txt")
+
+
+def test_group_references_are_not_literal_text():
+    assert required_literals(r"(ab)xyz\1xyz") == ["xyz", "xyz"]
+
+
+def test_compile_glob():
+    assert compile_glob("*.py").match("a.py")
+    assert not compile_glob("*.py").match("dir/a.py")
+    assert compile_glob("**/*.py").match("dir/sub/a.py")
+    assert compile_glob("src/[!_]*.py").match("src/a.py")
+    assert not compile_glob("src/[!_]*.py").match("src/_a.py")
+
+
+class Loader:
+    def __init__(self, files):
+        self.files = files
+        self.loads = 0
+
+    def __call__(self, path):
+        self.loads += 1
+        return self.files.get(path)
+
+
+def test_search_answers_from_its_own_view():
+    index = SearchIndex()
+    parent = Loader({"a.txt": "hello there", "b.txt": "nothing"})
+    child = Loader({"a.txt": "goodbye now", "b.txt": "nothing"})
+    parent_versions = {"a.txt": 1, "b.txt": 1}
+    child_versions = {"a.txt": 2, "b.txt": 1}
+
+    assert index.search(parent_versions, parent, ["hello"]) == ["a.txt"]
+    assert index.search(child_versions, child, ["hello"]) == []
+    assert index.search(child_versions, child, ["goodbye"]) == ["a.txt"]
+    assert index.search(parent_versions, parent, ["goodbye"]) == []
+    assert index.search(parent_versions, parent, []) == ["a.txt", "b.txt"]
+    # Alternating views don't reindex anything
+    assert (parent.loads, child.loads) == (2, 1)
+
+
+def test_search_evicts_stale_versions():
+    index = SearchIndex(max_stale=2)
+    for version in range(10):
+        index.search({"a.txt": version}, lambda path: f"text {version}", [])
+    assert len(index) <= 3
+
+
+def test_concurrent_views_have_no_false_negatives():
+    index = SearchIndex()
+    views = [
+        ({"a.txt": f"v{i}", "common.txt": "c"}, {"a.txt": f"needle{i} here", "common.txt": "common"}.get)
+        for i in range(4)
+    ]
+    errors = []
+
+    def run(i):
+        versions, load = views[i]
+        for _ in range(200):
+            if index.search(versions, load, [f"needle{i}"]) != ["a.txt"]:
+                errors.append(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_state_backend_searches_overlays_separately():
+    backend = StateBackend()
+    config = {"configurable": {"thread_id": "t"}}
+    parent = {"files": file_reducer({}, {"a.txt": "alpha", "b.txt": "beta"})}
+    overlay = FileOverlay(parent["files"])
+    overlay.apply({"a.txt": "gamma"})
+    child = {"files": overlay}
+    assert backend.search(["alpha"], parent, config) == ["a.txt"]
+    assert backend.search(["alpha"], child, config) == []
+    assert backend.search(["gamma"], child, config) == ["a.txt"]
+    assert backend.search(["gamma"], parent, config) == []
+
+
+def test_state_backend_versions_are_digests():
+    backend = StateBackend()
+    files = file_reducer({}, {"a.txt": "x" * 10_000})
+    versions = backend.file_versions({"files": files}, {})
+    assert len(versions["a.txt"]) == 64
+    assert versions == backend.file_versions({"files": {"a.txt": "x" * 10_000}}, {})
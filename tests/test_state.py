@@ -0,0 +1,94 @@
+import asyncio
+
+from langchain_core.messages import ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from deepagents import create_deep_agent
+from deepagents.files import FileContent, FileMap, FileOverlay
+from deepagents.state import file_reducer
+from fake_model import ScriptedChatModel
+
+
+def test_reducer_converts_plain_dicts():
+    files = file_reducer({"a.txt": "a"}, {"b.txt": "b"})
+    assert isinstance(files, FileMap)
+    assert files == {"a.txt": "a", "b.txt": "b"}
+    assert isinstance(files["a.txt"], FileContent)
+
+
+def test_reducer_does_not_mutate_previous_value():
+    first = file_reducer({}, {"a.txt": "a", "b.txt": "b"})
+    first.sorted_paths()
+    second = file_reducer(first, {"c.txt": "c", "a.txt": None})
+    assert first == {"a.txt": "a", "b.txt": "b"}
+    assert first.sorted_paths() == ["a.txt", "b.txt"]
+    assert second == {"b.txt": "b", "c.txt": "c"}
+    assert second.sorted_paths() == ["b.txt", "c.txt"]
+
+
+def test_reducer_shares_contents():
+    first = file_reducer({}, {"a.txt": "a" * 1000})
+    second = file_reducer(first, {"b.txt": "b"})
+    assert second["a.txt"] is first["a.txt"]
+
+
+def test_versions_share_sorted_paths_until_the_paths_change():
+    first = file_reducer({}, {"b.txt": "b", "d.txt": "d"})
+    assert first.sorted_paths() == ["b.txt", "d.txt"]
+    edited = file_reducer(first, {"b.txt": "b2"})
+    assert edited.sorted_paths() is first.sorted_paths()
+    added = file_reducer(edited, {"a.txt": "a", "d.txt": None})
+    assert added.sorted_paths() == ["a.txt", "b.txt"]
+    assert first.sorted_paths() == edited.sorted_paths() == ["b.txt", "d.txt"]
+    # Changing an older version in place doesn't reach the newer ones either
+    first["c.txt"] = "c"
+    assert first.sorted_paths() == ["b.txt", "c.txt", "d.txt"]
+    assert edited.sorted_paths() == ["b.txt", "d.txt"]
+
+
+def test_reducer_none_delta_keeps_value():
+    first = file_reducer({}, {"a.txt": "a"})
+    assert file_reducer(first, None) is first
+
+
+def test_reducer_adopts_overlay():
+    overlay = FileOverlay({"a.txt": "a"})
+    assert file_reducer({}, overlay) is overlay
+    assert file_reducer(overlay, {"b.txt": "b"}) is not overlay
+    assert overlay == {"a.txt": "a"}
+
+
+class SlowSaver(InMemorySaver):
+    """Writes checkpoints after a delay, like a remote checkpointer."""
+
+    async def aput(self, *args, **kwargs):
+        await asyncio.sleep(0.02)
+        return super().put(*args, **kwargs)
+
+
+def _write_script(count):
+    return [[("write_file", {"file_path": f"f{i}.txt", "content": str(i)})] for i in range(count)] + ["done"]
+
+
+def test_checkpoint_history_keeps_files_of_each_step():
+    agent = create_deep_agent(
+        [], "", model=ScriptedChatModel(script=_write_script(5)), checkpointer=SlowSaver()
+    )
+    config = {"configurable": {"thread_id": "1"}}
+    asyncio.run(agent.ainvoke({"messages": [{"role": "user", "content": "go"}]}, config, durability="async"))
+
+    history = list(agent.get_state_history(config))
+    assert len(history) > 5
+    for snapshot in history:
+        written = sum(isinstance(m, ToolMessage) for m in snapshot.values.get("messages", []))
+        assert len(snapshot.values.get("files", {})) == written
+
+
+def test_streamed_snapshots_do_not_change():
+    agent = create_deep_agent([], "", model=ScriptedChatModel(script=_write_script(3)))
+    snapshots = [
+        (chunk.get("files"), dict(chunk.get("files") or {}))
+        for chunk in agent.stream({"messages": [{"role": "user", "content": "go"}]}, stream_mode="values")
+    ]
+    for files, copy in snapshots:
+        assert dict(files or {}) == copy
@@ -0,0 +1,23 @@
+import inspect
+
+from deepagents import create_deep_agent
+from deepagents.model import get_default_model
+from deepagents.sub_agent import _get_subagent_graph
+
+
+def _subagent_graph(agent, subagent_type="general-purpose"):
+    task = agent.nodes["tools"].bound.tools_by_name["task"]
+    agents = inspect.getclosurevars(task.coroutine).nonlocals["agents"]
+    return _get_subagent_graph(*agents[subagent_type])
+
+
+def test_default_model_is_shared():
+    assert get_default_model() is get_default_model()
+
+
+def test_agents_on_the_default_model_share_subagent_graphs():
+    subagents = [{"name": "researcher", "description": "Researches.", "prompt": "Research."}]
+    first = create_deep_agent([], "Test agent.", subagents=subagents)
+    second = create_deep_agent([], "Test agent.", subagents=subagents)
+    assert _subagent_graph(first) is _subagent_graph(second)
+    assert _subagent_graph(first, "researcher") is _subagent_graph(second, "researcher")
@@ -0,0 +1,80 @@
+import asyncio
+
+from fake_model import ScriptedChatModel
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent, read_only, writes_files
+
+import pytest
+
+EDITS = [
+    ("edit_file", {"file_path": "a.txt", "old_string": "one", "new_string": "ONE"}),
+    ("edit_file", {"file_path": "a.txt", "old_string": "two", "new_string": "TWO"}),
+    ("write_file", {"file_path": "b.txt", "content": "b"}),
+    ("read_file", {"file_path": "a.txt"}),
+]
+
+
+def _run(tools, calls, tool_execution, use_async=False):
+    agent = create_deep_agent(
+        tools, "Test agent.", model=ScriptedChatModel(script=[calls, "done"]), tool_execution=tool_execution
+    )
+    input = {"messages": [{"role": "user", "content": "go"}], "files": {"a.txt": "one\ntwo\n"}}
+    if use_async:
+        return asyncio.run(agent.ainvoke(input))
+    return agent.invoke(input)
+
+
+def _tool_messages(result):
+    return [m for m in result["messages"] if isinstance(m, ToolMessage)]
+
+
+def test_parallel_edits_to_one_file_race():
+    result = _run([], EDITS, "parallel")
+    assert result["files"]["a.txt"] in ("ONE\ntwo\n", "one\nTWO\n")
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_isolated_edits_to_one_file_run_in_order(use_async):
+    result = _run([], EDITS, "isolated", use_async)
+    assert result["files"] == {"a.txt": "ONE\nTWO\n", "b.txt": "b"}
+    messages = _tool_messages(result)
+    # One result per call, in the order of the calls
+    assert [m.name for m in messages] == [name for name, _ in EDITS]
+    # The read ran alongside the first round, so it saw the original file
+    assert "one" in messages[-1].content
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_unclassified_tools_run_after_the_others(use_async):
+    order = []
+
+    @tool
+    def unknown(x: str) -> str:
+        """A tool nothing is known about."""
+        order.append(("unknown", x))
+        return x
+
+    @tool
+    def search(x: str) -> str:
+        """Search."""
+        order.append(("search", x))
+        return x
+
+    @tool
+    def save(path: str) -> str:
+        """Save."""
+        order.append(("save", path))
+        return path
+
+    calls = [("unknown", {"x": "1"}), ("search", {"x": "2"}), ("save", {"path": "p"}), ("unknown", {"x": "3"})]
+    result = _run([unknown, read_only(search), writes_files(save, "path")], calls, "isolated", use_async)
+    assert sorted(order[:2]) == [("save", "p"), ("search", "2")]
+    assert order[2:] == [("unknown", "1"), ("unknown", "3")]
+    assert [m.content for m in _tool_messages(result)] == ["1", "2", "p", "3"]
+
+
+def test_unknown_tool_execution_mode():
+    with pytest.raises(ValueError):
+        _run([], [], "sometimes")